@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -176,6 +178,21 @@ STATICFILES_DIRS = [
 # 收集静态文件的目标目录（生产环境必备）
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# 上传文件的存储目录
+MEDIA_URL = 'media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# 数据导入文件的临时目录（Web 进程写入，Celery Worker 读取后删除，两者需共享该目录）
+# Web 与 Worker 部署在同一台机器时可设为内存文件系统（如 /dev/shm/imports）以避免磁盘 IO
+IMPORT_UPLOAD_DIR = Path(os.environ.get('IMPORT_UPLOAD_DIR', MEDIA_ROOT / 'imports'))
+
+# 批量写入（bulk_create / fast_update）每条 SQL 的行数，未配置时按数据库后端自动选择
+# （PostgreSQL 约 1000 行最佳，超过 1 万行反而变慢；MySQL / SQLite 可用 5000~10000）
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 0)) or None
+
+# 计算每日统计时待写入记录累计到该数量后写入一次数据库（越大写入次数越少，内存占用越高）
+DAILY_STATS_FLUSH_SIZE = int(os.environ.get('DAILY_STATS_FLUSH_SIZE', 5000))
+
 
 AUTH_USER_MODEL = 'accounts.User'
 
@@ -208,6 +225,14 @@ CELERY_RESULT_EXPIRES = 3600  # 1小时
 CELERY_TASK_TIME_LIMIT = 300  # 5分钟
 CELERY_TASK_SOFT_TIME_LIMIT = 240  # 4分钟软限制
 
+# 定时任务（需启动 celery beat）：每天凌晨 2 点重新计算最近两天的每日统计
+CELERY_BEAT_SCHEDULE = {
+    'calculate-recent-daily-statistics': {
+        'task': 'staff_dashboard.calculate_recent_daily_statistics_task',
+        'schedule': crontab(hour=2, minute=0),
+    },
+}
+
 # ========================================
 # Django 缓存配置（使用 Redis）
 # ========================================
@@ -2,10 +2,13 @@
 工作台数据导入 API 接口
 支持学生基本信息及五类行为数据的批量导入
 """
+from django.conf import settings
 from ninja import Router, Schema, File
 from ninja.files import UploadedFile
 from typing import Optional, List
-import base64
+from pathlib import Path
+import os
+import uuid
 
 router = Router(tags=["工作台-数据导入"])
 
@@ -31,6 +34,7 @@ class TaskStatusResponse(Schema):
     message: str = ""
     records: Optional[int] = None
     errors: Optional[List[str]] = None
+    error_total: Optional[int] = None
 
 
 class ImportSummaryResponse(Schema):
@@ -40,6 +44,41 @@ class ImportSummaryResponse(Schema):
     last_import_time: Optional[str] = None
 
 
+def _save_upload(file: UploadedFile) -> str:
+    """
+    将上传文件分块写入导入目录，返回保存路径
+
+    任务只接收文件路径，避免通过消息队列传递整个文件内容
+    """
+    upload_dir = Path(settings.IMPORT_UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+
+    ext = os.path.splitext(file.name)[1].lower()
+    file_path = upload_dir / f'{uuid.uuid4().hex}{ext}'
+    with open(file_path, 'wb') as f:
+        for chunk in file.chunks():
+            f.write(chunk)
+
+    return str(file_path)
+
+
+def _submit_import_task(task, file: UploadedFile, **kwargs):
+    """
+    保存上传文件并提交导入任务（文件由任务在导入结束后删除）
+
+    提交失败（如消息队列不可用）时删除已保存的文件后重新抛出异常，避免文件遗留在导入目录
+    """
+    file_path = _save_upload(file)
+    try:
+        return task.delay(file_path=file_path, filename=file.name, **kwargs)
+    except Exception:
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+        raise
+
+
 @router.post("/import/students", response={200: TaskResponse, 400: dict})
 def import_students(request, file: UploadedFile = File(...)):
     """
@@ -66,14 +105,7 @@ def import_students(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_students_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_students_task.delay(
-            user_id=request.user.id,
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_students_task, file, user_id=request.user.id)
 
         return 200, {
             "status": "submitted",
@@ -106,15 +138,7 @@ def import_canteen_records(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_records_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_records_task.delay(
-            user_id=request.user.id,
-            record_type='canteen',
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_records_task, file, user_id=request.user.id, record_type='canteen')
 
         return 200, {
             "status": "submitted",
@@ -144,15 +168,7 @@ def import_school_gate_records(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_records_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_records_task.delay(
-            user_id=request.user.id,
-            record_type='school-gate',
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_records_task, file, user_id=request.user.id, record_type='school-gate')
 
         return 200, {
             "status": "submitted",
@@ -182,15 +198,7 @@ def import_dormitory_records(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_records_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_records_task.delay(
-            user_id=request.user.id,
-            record_type='dormitory',
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_records_task, file, user_id=request.user.id, record_type='dormitory')
 
         return 200, {
             "status": "submitted",
@@ -220,15 +228,7 @@ def import_network_records(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_records_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_records_task.delay(
-            user_id=request.user.id,
-            record_type='network',
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_records_task, file, user_id=request.user.id, record_type='network')
 
         return 200, {
             "status": "submitted",
@@ -260,15 +260,7 @@ def import_academic_records(request, file: UploadedFile = File(...)):
     try:
         from .tasks import import_records_task
 
-        file_content = file.read()
-        file_b64 = base64.b64encode(file_content).decode('utf-8')
-
-        task = import_records_task.delay(
-            user_id=request.user.id,
-            record_type='academic',
-            file_content=file_b64,
-            filename=file.name
-        )
+        task = _submit_import_task(import_records_task, file, user_id=request.user.id, record_type='academic')
 
         return 200, {
             "status": "submitted",
@@ -313,7 +305,8 @@ def check_import_status(request, task_id: str):
             "message": result.get('message', '导入完成'),
             "current": 100,
             "records": result.get('records'),
-            "errors": result.get('errors', [])
+            "errors": result.get('errors', []),
+            "error_total": result.get('error_total')
         }
 
     return {
@@ -427,12 +420,14 @@ def clear_statistics(request):
 
     try:
         from .models import DailyStatistics
+        from .cache import invalidate_data_statistics
 
         # 记录删除前的数据量
         deleted_count = DailyStatistics.objects.count()
 
         # 执行删除
         DailyStatistics.objects.all().delete()
+        invalidate_data_statistics()
 
         return 200, {
             "status": "success",
@@ -476,6 +471,7 @@ def clear_all_data(request):
             AcademicRecord,
             DailyStatistics
         )
+        from .cache import invalidate_data_statistics, invalidate_lookup_map, invalidate_student_statistics
 
         # 记录删除前的数据量
         deleted_counts = {
@@ -497,6 +493,11 @@ def clear_all_data(request):
         CanteenConsumptionRecord.objects.all().delete()
         Student.objects.all().delete()
 
+        # 学生模型不监听 post_delete（以保留快速删除），批量删除后统一使相关缓存失效
+        invalidate_lookup_map('student')
+        invalidate_student_statistics()
+        invalidate_data_statistics()
+
         return 200, {
             "status": "success",
             "message": "所有数据已清空",
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StaffDashboardConfig(AppConfig):
     name = 'staff_dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401
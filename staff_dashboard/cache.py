@@ -0,0 +1,96 @@
+"""
+工作台缓存工具
+导入任务的查找映射缓存，以及学生人数统计、学生行为统计缓存的版本号管理
+（由视图、导入任务、信号处理共用，不依赖视图模块）
+"""
+import time
+
+from django.core.cache import cache
+
+# 导入任务使用的代码/学号到主键映射的缓存（模型保存时由 signals.py 失效，批量删除和导入时由调用方失效）
+LOOKUP_CACHE_TIMEOUT = 300
+_LOOKUP_CACHE_KEYS = {
+    'student': 'import_lookup:students:v1',
+    'college': 'import_lookup:colleges:v1',
+    'major': 'import_lookup:majors:v1',
+    'grade': 'import_lookup:grades:v1',
+}
+
+# 学生人数统计缓存：学生、学院、专业、年级数据变更时递增版本号，旧缓存随之失效
+_STUDENT_STATISTICS_VERSION_KEY = 'student_statistics:version'
+
+# 学生行为统计缓存：导入行为记录、重新计算或清空每日统计后递增版本号，旧缓存随之失效
+_DATA_STATISTICS_VERSION_KEY = 'data_statistics:version'
+
+
+def get_lookup_map(name):
+    """
+    获取导入任务使用的查找映射（优先读取缓存）
+
+    Args:
+        name: student（学号）/ college（学院代码）/ major（专业代码）/ grade（入学年份）
+
+    Returns:
+        dict: 代码到主键的映射
+    """
+    from .models import Student
+    from accounts.models import College, Major, Grade
+
+    key = _LOOKUP_CACHE_KEYS[name]
+    lookup = cache.get(key)
+    if lookup is None:
+        if name == 'student':
+            lookup = dict(Student.objects.values_list('student_id', 'id'))
+        elif name == 'college':
+            lookup = dict(College.objects.values_list('code', 'id'))
+        elif name == 'major':
+            lookup = dict(Major.objects.values_list('code', 'id'))
+        else:
+            lookup = dict(Grade.objects.values_list('year', 'id'))
+        cache.set(key, lookup, LOOKUP_CACHE_TIMEOUT)
+    return lookup
+
+
+def invalidate_lookup_map(name):
+    """使查找映射缓存失效"""
+    cache.delete(_LOOKUP_CACHE_KEYS[name])
+
+
+def _initial_cache_version():
+    # 版本号不存在（首次使用或已被淘汰）时以当前纳秒时间戳初始化：淘汰前的版本号从更早的时间戳开始
+    # 逐次加一，递增次数远小于经过的纳秒数，因此不会与仍在有效期内的旧版本号重复
+    return time.time_ns()
+
+
+def _get_cache_version(version_key):
+    """读取缓存版本号，不存在时初始化"""
+    cache.add(version_key, _initial_cache_version(), None)
+    version = cache.get(version_key)
+    return _initial_cache_version() if version is None else version
+
+
+def _bump_cache_version(version_key):
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        cache.set(version_key, _initial_cache_version(), None)
+
+
+def get_student_statistics_version():
+    """学生人数统计（及数据分析页筛选选项）缓存的当前版本号"""
+    return _get_cache_version(_STUDENT_STATISTICS_VERSION_KEY)
+
+
+def get_data_statistics_version():
+    """学生行为统计缓存的当前版本号"""
+    return _get_cache_version(_DATA_STATISTICS_VERSION_KEY)
+
+
+def invalidate_student_statistics():
+    """使所有用户的学生人数统计缓存失效"""
+    _bump_cache_version(_STUDENT_STATISTICS_VERSION_KEY)
+
+
+def invalidate_data_statistics():
+    """使所有学生行为统计缓存失效"""
+    _bump_cache_version(_DATA_STATISTICS_VERSION_KEY)
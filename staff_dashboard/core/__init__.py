@@ -4,6 +4,8 @@ staff_dashboard.core 模块
 """
 
 from .statistics import (
+    BATCH_AGGREGATORS,
+    EMPTY_STATS,
     calculate_canteen_stats,
     calculate_gate_stats,
     calculate_dormitory_stats,
@@ -12,6 +14,8 @@ from .statistics import (
 )
 
 __all__ = [
+    'BATCH_AGGREGATORS',
+    'EMPTY_STATS',
     'calculate_canteen_stats',
     'calculate_gate_stats',
     'calculate_dormitory_stats',
@@ -14,75 +14,281 @@
 - 寝室门禁聚合统计
 - 网络访问聚合统计
 - 学业成绩聚合统计
+
+batch_aggregate_*_stats 一次查询读取一批学生的记录，用 pandas 分组聚合，返回 {student_id: stats}；
+没有任何记录的学生不出现在结果中，调用方使用 EMPTY_STATS 中对应的默认值。
+calculate_*_stats 为单个学生的版本
 """
 
-from datetime import datetime, time, timedelta
-from django.db.models import Avg, Min, Q
-from django.utils import timezone
+from types import MappingProxyType
 
-def calculate_canteen_stats(student, start_date, end_date):
+import pandas as pd
+
+# 各统计类型在范围内没有任何记录时的默认结果
+EMPTY_STATS = MappingProxyType({
+    'canteen': MappingProxyType({'avg_expense': 0, 'expense_trend': 0, 'min_expense': 0}),
+    'school_gate': MappingProxyType({'total_count': 0, 'night_in_out_count': 0, 'late_night_in_out_count': 0}),
+    'dormitory': MappingProxyType({'total_count': 0, 'night_in_out_count': 0, 'late_night_in_out_count': 0}),
+    'network': MappingProxyType({
+        'vpn_usage_rate': 0, 'night_usage_rate': 0, 'late_night_usage_rate': 0, 'avg_duration': 0, 'max_duration': 0
+    }),
+    'academic': MappingProxyType({'avg_score': 0, 'score_trend': 0}),
+})
+
+
+def _trend_by_student(values):
     """
-    实时计算食堂消费统计（直接查询月度记录）
-    
+    按学生计算变化趋势：首尾各取至多两个值的均值，计算变化百分比
+
     Args:
-        student: Student 模型实例
-        start_date: 开始日期 (date 对象)
-        end_date: 结束日期 (date 对象)
+        values: 以 student_id 为索引、同一学生的值按时间升序排列的 Series
+
+    Returns:
+        Series: {student_id: 趋势百分比}，少于两个值或起始均值不为正时为 0
+    """
+    grouped = values.groupby(level=0, sort=False)
+    initial_avg = grouped.head(2).groupby(level=0).mean()
+    final_avg = grouped.tail(2).groupby(level=0).mean()
+    trend = (final_avg - initial_avg) / initial_avg * 100
+    return trend.where((grouped.size() >= 2) & (initial_avg > 0), 0)
+
+
+def _month_index(dates):
+    """将日期列转换为可比较的月份序号（年 * 12 + 月）"""
+    dates = pd.to_datetime(dates)
+    return dates.dt.year * 12 + dates.dt.month
+
+
+def _daily_frame(data_type, student_ids, start_date, end_date, keys):
+    """
+    读取一批学生日期范围内的每日统计，statistics_data 中的指标由数据库提取为独立列
+
+    Args:
+        student_ids: 学生ID列表，或 values('id') 查询集（作为子查询，避免超长 IN 参数列表）
+        keys: 需要提取的 statistics_data 键
+
+    Returns:
+        DataFrame: student_id, date 及各指标列（缺失的指标为 0），按日期升序
+    """
+    from staff_dashboard.models import DailyStatistics
+    
+    rows = DailyStatistics.objects.filter(
+        student_id__in=student_ids,
+        data_type=data_type,
+        date__gte=start_date,
+        date__lte=end_date
+    ).order_by('date').values_list(
+        'student_id', 'date', *(f'statistics_data__{key}' for key in keys)
+    ).iterator(chunk_size=10000)
+    df = pd.DataFrame.from_records(rows, columns=['student_id', 'date', *keys])
+    for key in keys:
+        df[key] = pd.to_numeric(df[key], errors='coerce').fillna(0)
+    return df
+
+
+def batch_aggregate_canteen_stats(student_ids, start_date, end_date):
+    """
+    批量计算食堂消费统计（直接查询月度记录）
     
     Returns:
-        dict: {
+        dict: {student_id: {
             'avg_expense': float,      # 月均消费
             'min_expense': float,      # 最低消费
             'expense_trend': float     # 消费趋势（百分比）
-        }
+        }}
     """
     from staff_dashboard.models import CanteenConsumptionRecord
     
-    # 生成月份范围列表
-    start_month = start_date.strftime('%Y-%m')
-    end_month = end_date.strftime('%Y-%m')
-    
     # 查询月份范围内的记录
-    records = CanteenConsumptionRecord.objects.filter(
-        student=student,
-        month__gte=start_month,
-        month__lte=end_month
-    ).order_by('month')
+    rows = CanteenConsumptionRecord.objects.filter(
+        student_id__in=student_ids,
+        month__gte=start_date.strftime('%Y-%m'),
+        month__lte=end_date.strftime('%Y-%m')
+    ).order_by('month').values_list('student_id', 'amount').iterator(chunk_size=10000)
+    df = pd.DataFrame.from_records(rows, columns=['student_id', 'amount'])
+    if df.empty:
+        return {}
+    
+    expenses = df['amount'].astype(float)
+    expenses.index = df['student_id']
+    grouped = expenses.groupby(level=0)
+    summary = pd.DataFrame({
+        'avg_expense': grouped.mean(),
+        'min_expense': grouped.min(),
+        'expense_trend': _trend_by_student(expenses),
+    })
+    
+    return {
+        student_id: {
+            'avg_expense': round(avg_expense, 2),
+            'expense_trend': round(expense_trend, 2),
+            'min_expense': round(min_expense, 2),
+        }
+        for student_id, avg_expense, min_expense, expense_trend in summary.itertuples(name=None)
+    }
+
+
+_ACCESS_KEYS = ('total_count', 'night_in_out_count', 'late_night_in_out_count')
+
+
+def _batch_aggregate_access_stats(data_type, student_ids, start_date, end_date):
+    """按学生累加每日门禁进出次数（校门 / 寝室共用）"""
+    df = _daily_frame(data_type, student_ids, start_date, end_date, _ACCESS_KEYS)
+    if df.empty:
+        return {}
     
-    if not records.exists():
-        return {'avg_expense': 0, 'expense_trend': 0, 'min_expense': 0}
+    totals = df.groupby('student_id')[list(_ACCESS_KEYS)].sum().astype('int64')
+    return {
+        student_id: {
+            'total_count': total_count,
+            'night_in_out_count': night_in_out_count,
+            'late_night_in_out_count': late_night_in_out_count
+        }
+        for student_id, total_count, night_in_out_count, late_night_in_out_count
+        in totals.itertuples(name=None)
+    }
+
+
+def batch_aggregate_gate_stats(student_ids, start_date, end_date):
+    """
+    批量聚合校门门禁统计（基于每日统计）
     
-    # 获取所有月份的消费
-    expenses = [float(record.amount) for record in records]
+    Returns:
+        dict: {student_id: {'total_count': int, 'night_in_out_count': int, 'late_night_in_out_count': int}}
+    """
+    return _batch_aggregate_access_stats('school_gate', student_ids, start_date, end_date)
+
+
+def batch_aggregate_dormitory_stats(student_ids, start_date, end_date):
+    """
+    批量聚合寝室门禁统计（基于每日统计）
     
-    # 计算月均消费
-    avg_expense = sum(expenses) / len(expenses)
-    avg_expense = round(avg_expense, 2)
+    Returns:
+        dict: {student_id: {'total_count': int, 'night_in_out_count': int, 'late_night_in_out_count': int}}
+    """
+    return _batch_aggregate_access_stats('dormitory', student_ids, start_date, end_date)
+
+
+def batch_aggregate_network_stats(student_ids, start_date, end_date):
+    """
+    批量聚合网络访问统计（基于每日统计）
     
-    # 计算最低消费
-    min_expense = min(expenses)
-    min_expense = round(min_expense, 2)
+    Returns:
+        dict: {student_id: {
+            'vpn_usage_rate': float,
+            'night_usage_rate': float,  # 夜间覆盖率
+            'late_night_usage_rate': float,  # 深夜覆盖率
+            'avg_duration': float,
+            'max_duration': float
+        }}
+    """
+    df = _daily_frame(
+        'network', student_ids, start_date, end_date,
+        ('vpn_usage_rate', 'night_usage_rate', 'late_night_usage_rate', 'avg_duration')
+    )
+    if df.empty:
+        return {}
     
-    # 计算消费趋势
-    expense_trend = 0
-    if len(expenses) >= 2:
-        initial_records = expenses[:min(2, len(expenses))]
-        final_records = expenses[-min(2, len(expenses)):]
-        
-        initial_avg = sum(initial_records) / len(initial_records)
-        final_avg = sum(final_records) / len(final_records)
-        
-        if initial_avg > 0:
-            expense_trend = ((final_avg - initial_avg) / initial_avg) * 100
-            expense_trend = round(expense_trend, 2)
+    # 计算统计范围内的总天数
+    total_days = (end_date - start_date).days + 1
     
+    # VPN 使用时长；夜间 / 深夜标记（0或1）大于 0 即视为当天有访问
+    df['vpn_duration'] = df['avg_duration'] * (df['vpn_usage_rate'] / 100)
+    df['night_day'] = df['night_usage_rate'] > 0
+    df['late_night_day'] = df['late_night_usage_rate'] > 0
+    df['month'] = _month_index(df['date'])
+    
+    # 按学生统计总时长、VPN 时长和覆盖天数
+    summary = df.groupby('student_id').agg(
+        total_duration=('avg_duration', 'sum'),
+        total_vpn_duration=('vpn_duration', 'sum'),
+        night_days=('night_day', 'sum'),
+        late_night_days=('late_night_day', 'sum'),
+    )
+    # 按月统计时长，计算月均时长和最大月时长
+    monthly_duration = df.groupby(['student_id', 'month'])['avg_duration'].sum().groupby(level=0)
+    summary['avg_duration'] = monthly_duration.mean()
+    summary['max_duration'] = monthly_duration.max()
+    
+    # 计算占比
+    total_duration = summary['total_duration']
+    summary['vpn_usage_rate'] = (summary['total_vpn_duration'] / total_duration * 100).where(total_duration > 0, 0)
+    summary['night_usage_rate'] = summary['night_days'] / total_days * 100  # 覆盖率
+    summary['late_night_usage_rate'] = summary['late_night_days'] / total_days * 100  # 覆盖率
+    
+    columns = ['vpn_usage_rate', 'night_usage_rate', 'late_night_usage_rate', 'avg_duration', 'max_duration']
     return {
-        'avg_expense': avg_expense,
-        'expense_trend': expense_trend,
-        'min_expense': min_expense
+        student_id: {column: round(value, 2) for column, value in zip(columns, values)}
+        for student_id, *values in summary[columns].itertuples(name=None)
     }
 
 
+def batch_aggregate_academic_stats(student_ids, start_date, end_date):
+    """
+    批量聚合学业成绩统计（基于每日统计）
+    
+    Returns:
+        dict: {student_id: {'avg_score': float, 'score_trend': float}}
+    """
+    df = _daily_frame('academic', student_ids, start_date, end_date, ('avg_score',))
+    if df.empty:
+        return {}
+    
+    # 有记录但没有有效成绩的学生返回默认值
+    results = {student_id: dict(EMPTY_STATS['academic']) for student_id in df['student_id'].unique().tolist()}
+    
+    # 只统计有效成绩，按月计算平均成绩（groupby 按学生、月份排序）
+    valid = df[df['avg_score'] > 0]
+    if valid.empty:
+        return results
+    monthly_scores = valid.groupby([valid['student_id'], _month_index(valid['date'])])['avg_score'].mean()
+    monthly_scores = monthly_scores.droplevel(1)
+    
+    summary = pd.DataFrame({
+        'avg_score': monthly_scores.groupby(level=0).mean(),
+        'score_trend': _trend_by_student(monthly_scores),
+    })
+    for student_id, avg_score, score_trend in summary.itertuples(name=None):
+        results[student_id] = {
+            'avg_score': round(avg_score, 2),
+            'score_trend': round(score_trend, 2)
+        }
+    return results
+
+
+BATCH_AGGREGATORS = MappingProxyType({
+    'canteen': batch_aggregate_canteen_stats,
+    'school_gate': batch_aggregate_gate_stats,
+    'dormitory': batch_aggregate_dormitory_stats,
+    'network': batch_aggregate_network_stats,
+    'academic': batch_aggregate_academic_stats,
+})
+
+
+def _single_student_stats(data_type, student, start_date, end_date):
+    stats = BATCH_AGGREGATORS[data_type]([student.id], start_date, end_date).get(student.id)
+    return stats if stats is not None else dict(EMPTY_STATS[data_type])
+
+
+def calculate_canteen_stats(student, start_date, end_date):
+    """
+    实时计算食堂消费统计（直接查询月度记录）
+    
+    Args:
+        student: Student 模型实例
+        start_date: 开始日期 (date 对象)
+        end_date: 结束日期 (date 对象)
+    
+    Returns:
+        dict: {
+            'avg_expense': float,      # 月均消费
+            'min_expense': float,      # 最低消费
+            'expense_trend': float     # 消费趋势（百分比）
+        }
+    """
+    return _single_student_stats('canteen', student, start_date, end_date)
+
+
 def calculate_gate_stats(student, start_date, end_date):
     """
     聚合计算校门门禁统计（基于每日统计）
@@ -99,32 +305,7 @@ def calculate_gate_stats(student, start_date, end_date):
             'late_night_in_out_count': int
         }
     """
-    from staff_dashboard.models import DailyStatistics
-    
-    daily_stats = DailyStatistics.objects.filter(
-        student=student,
-        data_type='school_gate',
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    if not daily_stats.exists():
-        return {'total_count': 0, 'night_in_out_count': 0, 'late_night_in_out_count': 0}
-    
-    total_count = 0
-    night_in_out_count = 0
-    late_night_in_out_count = 0
-    
-    for stat in daily_stats:
-        total_count += stat.statistics_data.get('total_count', 0)
-        night_in_out_count += stat.statistics_data.get('night_in_out_count', 0)
-        late_night_in_out_count += stat.statistics_data.get('late_night_in_out_count', 0)
-    
-    return {
-        'total_count': total_count,
-        'night_in_out_count': night_in_out_count,
-        'late_night_in_out_count': late_night_in_out_count
-    }
+    return _single_student_stats('school_gate', student, start_date, end_date)
 
 
 def calculate_dormitory_stats(student, start_date, end_date):
@@ -143,32 +324,7 @@ def calculate_dormitory_stats(student, start_date, end_date):
             'late_night_in_out_count': int
         }
     """
-    from staff_dashboard.models import DailyStatistics
-    
-    daily_stats = DailyStatistics.objects.filter(
-        student=student,
-        data_type='dormitory',
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    if not daily_stats.exists():
-        return {'total_count': 0, 'night_in_out_count': 0, 'late_night_in_out_count': 0}
-    
-    total_count = 0
-    night_in_out_count = 0
-    late_night_in_out_count = 0
-    
-    for stat in daily_stats:
-        total_count += stat.statistics_data.get('total_count', 0)
-        night_in_out_count += stat.statistics_data.get('night_in_out_count', 0)
-        late_night_in_out_count += stat.statistics_data.get('late_night_in_out_count', 0)
-    
-    return {
-        'total_count': total_count,
-        'night_in_out_count': night_in_out_count,
-        'late_night_in_out_count': late_night_in_out_count
-    }
+    return _single_student_stats('dormitory', student, start_date, end_date)
 
 
 def calculate_network_stats(student, start_date, end_date):
@@ -189,73 +345,7 @@ def calculate_network_stats(student, start_date, end_date):
             'max_duration': float
         }
     """
-    from staff_dashboard.models import DailyStatistics
-    from collections import defaultdict
-    from datetime import timedelta
-    
-    daily_stats = DailyStatistics.objects.filter(
-        student=student,
-        data_type='network',
-        date__gte=start_date,
-        date__lte=end_date
-    )
-    
-    if not daily_stats.exists():
-        return {'vpn_usage_rate': 0, 'night_usage_rate': 0, 'late_night_usage_rate': 0, 'avg_duration': 0, 'max_duration': 0}
-    
-    # 计算统计范围内的总天数
-    total_days = (end_date - start_date).days + 1
-    
-    # 按月聚合数据
-    monthly_duration = defaultdict(float)
-    total_vpn_duration = 0
-    total_duration = 0
-    night_days = 0  # 有夜间访问的天数
-    late_night_days = 0  # 有深夜访问的天数
-    
-    for stat in daily_stats:
-        month_key = stat.date.strftime('%Y-%m')
-        
-        # 获取每日的统计数据
-        vpn_rate = stat.statistics_data.get('vpn_usage_rate', 0)
-        night_flag = stat.statistics_data.get('night_usage_rate', 0)  # 0或1
-        late_night_flag = stat.statistics_data.get('late_night_usage_rate', 0)  # 0或1
-        daily_avg_duration = stat.statistics_data.get('avg_duration', 0)
-        
-        # 按月统计时长
-        monthly_duration[month_key] += daily_avg_duration
-        
-        # 统计总时长和 VPN 使用时长
-        total_duration += daily_avg_duration
-        total_vpn_duration += daily_avg_duration * (vpn_rate / 100)
-        
-        # 统计覆盖天数
-        if night_flag > 0:
-            night_days += 1
-        if late_night_flag > 0:
-            late_night_days += 1
-    
-    # 计算月均时长和最大月时长
-    if monthly_duration:
-        month_durations = list(monthly_duration.values())
-        avg_duration = sum(month_durations) / len(month_durations)
-        max_duration = max(month_durations)
-    else:
-        avg_duration = 0
-        max_duration = 0
-    
-    # 计算占比
-    vpn_usage_rate = (total_vpn_duration / total_duration * 100) if total_duration > 0 else 0
-    night_usage_rate = (night_days / total_days * 100) if total_days > 0 else 0  # 覆盖率
-    late_night_usage_rate = (late_night_days / total_days * 100) if total_days > 0 else 0  # 覆盖率
-    
-    return {
-        'vpn_usage_rate': round(vpn_usage_rate, 2),
-        'night_usage_rate': round(night_usage_rate, 2),
-        'late_night_usage_rate': round(late_night_usage_rate, 2),
-        'avg_duration': round(avg_duration, 2),
-        'max_duration': round(max_duration, 2)
-    }
+    return _single_student_stats('network', student, start_date, end_date)
 
 
 def calculate_academic_stats(student, start_date, end_date):
@@ -273,59 +363,4 @@ def calculate_academic_stats(student, start_date, end_date):
             'score_trend': float
         }
     """
-    from staff_dashboard.models import DailyStatistics
-    
-    daily_stats = DailyStatistics.objects.filter(
-        student=student,
-        data_type='academic',
-        date__gte=start_date,
-        date__lte=end_date
-    ).order_by('date')
-    
-    if not daily_stats.exists():
-        return {'avg_score': 0, 'score_trend': 0}
-    
-    # 按月聚合数据
-    from collections import defaultdict
-    monthly_scores = defaultdict(list)
-    
-    for stat in daily_stats:
-        month_key = stat.date.strftime('%Y-%m')
-        score = stat.statistics_data.get('avg_score', 0)
-        if score > 0:  # 只统计有效成绩
-            monthly_scores[month_key].append(score)
-    
-    if not monthly_scores:
-        return {'avg_score': 0, 'score_trend': 0}
-    
-    # 计算每个月的平均成绩
-    monthly_avg_scores = {}
-    for month, scores in monthly_scores.items():
-        monthly_avg_scores[month] = sum(scores) / len(scores)
-    
-    # 按月份排序
-    sorted_months = sorted(monthly_avg_scores.items())
-    scores = [score for _, score in sorted_months]
-    
-    # 计算平均成绩
-    avg_score = sum(scores) / len(scores)
-    avg_score = round(avg_score, 2)
-    
-    # 计算成绩趋势
-    score_trend = 0
-    if len(scores) >= 2:
-        initial_records = scores[:min(2, len(scores))]
-        final_records = scores[-min(2, len(scores)):]
-        
-        initial_avg = sum(initial_records) / len(initial_records)
-        final_avg = sum(final_records) / len(final_records)
-        
-        if initial_avg > 0:
-            score_trend = ((final_avg - initial_avg) / initial_avg) * 100
-            score_trend = round(score_trend, 2)
-    
-    return {
-        'avg_score': avg_score,
-        'score_trend': score_trend
-    }
-
+    return _single_student_stats('academic', student, start_date, end_date)
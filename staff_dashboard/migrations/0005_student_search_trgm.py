@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-16 10:30
+
+from django.db import migrations
+
+# 姓名/学号模糊搜索：icontains 在 PostgreSQL 上生成 UPPER(列::text) LIKE UPPER('%关键词%')，
+# 在同一表达式上建立 pg_trgm GIN 索引才能被使用。
+# 索引只在 PostgreSQL 上建立且不写入模型状态：GinIndex/TrigramExtension 要求安装 django.contrib.postgres
+# （依赖 psycopg），默认的 SQLite 环境下会导致系统检查和迁移失败。
+TRGM_INDEXES = [
+    ('student_name_trgm_idx', 'name'),
+    ('student_sid_trgm_idx', 'student_id'),
+]
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('staff_dashboard', 'Student')._meta.db_table)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for index_name, column in TRGM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {schema_editor.quote_name(index_name)} ON {table} '
+            f'USING gin (UPPER({schema_editor.quote_name(column)}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, _ in TRGM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {schema_editor.quote_name(index_name)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_dashboard', '0004_student_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
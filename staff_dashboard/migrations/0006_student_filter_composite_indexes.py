@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-16 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff_dashboard', '0005_student_search_trgm'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='student',
+            name='staff_dashb_college_555567_idx',
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['college', 'major', 'grade', 'student_id'], name='student_cmg_sid_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='student',
+            index=models.Index(fields=['grade', 'college', 'student_id'], name='student_gc_sid_idx'),
+        ),
+    ]
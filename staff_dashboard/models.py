@@ -1,4 +1,5 @@
 from django.db import models
+from fast_update.query import FastUpdateManager
 from accounts.models import College, Major, Grade
 
 
@@ -33,9 +34,18 @@ class Student(models.Model):
         verbose_name_plural = '学生'
         ordering = ['student_id']
         indexes = [
-            models.Index(fields=['college', 'major', 'grade']),
+            # 学院+专业+年级组合筛选后按学号排序，前缀同时覆盖原 (college, major, grade) 索引
+            models.Index(fields=['college', 'major', 'grade', 'student_id'], name='student_cmg_sid_idx'),
             models.Index(fields=['college', 'grade']),
             models.Index(fields=['major', 'grade']),
+            models.Index(fields=['grade', 'college', 'student_id'], name='student_gc_sid_idx'),
+            # 学生列表按单一维度筛选后按学号/姓名排序分页，复合索引避免每页重新排序
+            models.Index(fields=['college', 'student_id'], name='student_college_sid_idx'),
+            models.Index(fields=['major', 'student_id'], name='student_major_sid_idx'),
+            models.Index(fields=['grade', 'student_id'], name='student_grade_sid_idx'),
+            models.Index(fields=['name'], name='student_name_idx'),
+            # 姓名/学号模糊搜索使用的 UPPER() 表达式 pg_trgm GIN 索引只在 PostgreSQL 上建立，
+            # 不在此声明（GinIndex 要求安装 django.contrib.postgres），见迁移 0005
         ]
     
     def __str__(self):
@@ -219,6 +229,9 @@ class DailyStatistics(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='创建时间')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='更新时间')
     
+    # 提供 fast_update / copy_update，大批量更新统计结果时代替 bulk_update
+    objects = FastUpdateManager()
+    
     class Meta:
         verbose_name = '每日统计'
         verbose_name_plural = '每日统计'
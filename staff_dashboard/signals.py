@@ -0,0 +1,38 @@
+"""
+工作台信号处理
+学生、学院、专业、年级保存时使导入任务的查找映射缓存及学生人数统计缓存失效
+
+不监听 post_delete：有接收者时 QuerySet.delete() 无法走快速删除，需要逐条加载对象并发送信号，
+批量删除（如 clear_all_data）由调用方在删除后统一使缓存失效
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from accounts.models import College, Grade, Major
+
+from .cache import invalidate_lookup_map, invalidate_student_statistics
+from .models import Student
+
+
+@receiver(post_save, sender=Student)
+def invalidate_student_lookup(sender, **kwargs):
+    invalidate_lookup_map('student')
+    invalidate_student_statistics()
+
+
+@receiver(post_save, sender=College)
+def invalidate_college_lookup(sender, **kwargs):
+    invalidate_lookup_map('college')
+    invalidate_student_statistics()
+
+
+@receiver(post_save, sender=Major)
+def invalidate_major_lookup(sender, **kwargs):
+    invalidate_lookup_map('major')
+    invalidate_student_statistics()
+
+
+@receiver(post_save, sender=Grade)
+def invalidate_grade_lookup(sender, **kwargs):
+    invalidate_lookup_map('grade')
+    invalidate_student_statistics()
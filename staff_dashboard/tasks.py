@@ -2,71 +2,373 @@
 工作台数据导入 Celery 异步任务
 支持大文件批量处理、数据验证、错误收集、每日统计计算
 """
-from celery import shared_task
-from django.db import transaction
-from django.utils import timezone
+from celery import chord, shared_task
+from celery.exceptions import Ignore
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+import numpy as np
 import pandas as pd
+import csv
 import io
-import base64
-import pytz
+import logging
+import os
+import time
+from types import MappingProxyType
+from zoneinfo import ZoneInfo
 
-LOCAL_TZ = pytz.timezone('Asia/Shanghai')
+from .cache import (
+    get_lookup_map,
+    invalidate_data_statistics,
+    invalidate_lookup_map,
+    invalidate_student_statistics,
+)
+
+try:
+    # Rust 实现的 Excel 解析器（同时支持 .xlsx 和 .xls），速度和内存占用都明显优于 openpyxl
+    import python_calamine  # noqa: F401
+    _EXCEL_ENGINE = 'calamine'
+except ImportError:
+    # 由 pandas 按文件类型选择引擎（.xlsx 使用 openpyxl，.xls 使用 xlrd）
+    _EXCEL_ENGINE = None
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TZ = ZoneInfo('Asia/Shanghai')
+
+# 时间字符串末尾的时区标记（Z 或 +08:00 / -0500 形式的偏移量）
+_TZ_SUFFIX_PATTERN = r'(?:[zZ]|[+-]\d{2}:?\d{2})$'
+
+# 每次从文件中读取的行数（分块流式处理，峰值内存与文件大小无关）
+IMPORT_CHUNK_SIZE = 20000
+
+# 逐行详细验证（收集错误信息）的行数，超出部分直接跳过无效数据
+VALIDATION_LIMIT = 10000
+
+# 各数据库后端单条 INSERT 的批量大小：PostgreSQL 超过约 1000 行后收益递减，
+# MySQL 大批次收益明显；SQLite 的参数个数上限由 Django 在 bulk_create 内部自动处理
+_BULK_BATCH_SIZES = {'postgresql': 1000, 'mysql': 5000, 'sqlite': 5000, 'oracle': 1000}
+
+# PostgreSQL 上纯插入的数据块超过该行数时改用 COPY FROM STDIN 写入
+COPY_MIN_RECORDS = 10000
+
+# 每日统计的统计类型（DailyStatistics.data_type），每种类型独立计算
+STATISTICS_DATA_TYPES = ['canteen', 'school_gate', 'dormitory', 'network', 'academic']
+
+# 每日统计按学生分组拆分子任务时，每个子任务处理的学生数
+STATISTICS_STUDENTS_PER_TASK = 5000
+
+# 两次任务进度上报（update_state）之间的最短间隔（秒），减少结果后端的写入次数
+PROGRESS_UPDATE_INTERVAL = 1.0
+
+# 每个导入任务最多保留的错误信息条数（超出部分只计数，避免错误数据过多时占满内存）
+MAX_COLLECTED_ERRORS = 100
+
+# “进出方向”列取值到模型取值的映射（只读，所有任务共享）
+_DIRECTION_MAP = MappingProxyType({
+    '进': 'in', '出': 'out', 'in': 'in', 'out': 'out', '进入': 'in', '离开': 'out', '出去': 'out'
+})
+
+# “是否使用VPN”列中视为“是”的取值（统一去空格、转小写后比较）
+_VPN_TRUE_SET = frozenset({'是', 'yes', 'true', '1'})
+
+
+class _ErrorCollector:
+    """
+    导入错误信息收集器
+
+    最多保留 cap 条错误信息，超出部分只累加 total 计数
+    """
+
+    def __init__(self, cap=MAX_COLLECTED_ERRORS):
+        self.items = []
+        self.cap = cap
+        self.total = 0
+
+    def append(self, message):
+        self.total += 1
+        if len(self.items) < self.cap:
+            self.items.append(message)
+
+    def merge(self, items, total):
+        """合并其他任务收集的错误信息"""
+        for message in items[:max(0, self.cap - len(self.items))]:
+            self.items.append(message)
+        self.total += total
+
+
+class _ProgressReporter:
+    """
+    导入任务进度上报器
+
+    两次上报之间至少间隔 PROGRESS_UPDATE_INTERVAL 秒，间隔内的进度更新直接丢弃
+    """
+
+    def __init__(self, task):
+        self.task = task
+        self.last_update = time.monotonic()
+
+    def update(self, current, message):
+        now = time.monotonic()
+        if now - self.last_update >= PROGRESS_UPDATE_INTERVAL:
+            self.last_update = now
+            self.task.update_state(
+                state='IMPORTING',
+                meta={'current': current, 'total': 100, 'message': message}
+            )
+
+
+def _iter_file_chunks(file_obj, filename, total_bytes, required_columns):
+    """
+    按块读取上传的 CSV / Excel 文件
+
+    CSV 使用 chunksize 流式读取；Excel 无法流式读取，整表读取后按块切分
+    （优先使用 calamine 引擎，未安装 python-calamine 时由 pandas 选择默认引擎）。
+    只读取必需列，且所有列按字符串读取（跳过 pandas 的类型推断，学号的前导零也得以保留），
+    数值和时间列在使用时显式转换
+
+    Yields:
+        tuple: (数据块 DataFrame, 已读取进度 0~1)
+    """
+    # 使用函数形式的 usecols：缺少必需列时不会在读取阶段报错，而是交给调用方给出明确提示
+    required = set(required_columns)
+    usecols = lambda col: col in required
+
+    if filename.endswith('.csv'):
+        for chunk in pd.read_csv(
+            file_obj,
+            encoding='utf-8',
+            usecols=usecols,
+            dtype=str,
+            chunksize=IMPORT_CHUNK_SIZE
+        ):
+            yield chunk, min(file_obj.tell() / total_bytes, 1.0) if total_bytes else 1.0
+    else:
+        df = pd.read_excel(file_obj, engine=_EXCEL_ENGINE, usecols=usecols, dtype=str)
+        total_rows = len(df)
+        for start in range(0, total_rows, IMPORT_CHUNK_SIZE):
+            chunk = df.iloc[start:start + IMPORT_CHUNK_SIZE]
+            yield chunk, (start + len(chunk)) / total_rows
+
+
+def _parse_local_datetimes(series):
+    """
+    批量解析时间列（一次向量化解析代替逐行 pd.to_datetime）
+
+    每个值单独识别格式（同一列可混用 "2025-02-01 08:00"、"2025/02/01 08:00:00" 等写法）；
+    带时区偏移的时间换算到 Asia/Shanghai，不带时区的时间按 Asia/Shanghai 本地化，
+    夏令时跳过的时刻顺延到切换后，无法解析或有歧义的值为 NaT
+    """
+    values = series.fillna('').astype(str).str.strip()
+    aware = values.str.contains(_TZ_SUFFIX_PATTERN, regex=True)
+
+    naive_times = pd.to_datetime(values[~aware], errors='coerce', format='mixed')
+    parts = [
+        naive_times.dt.tz_localize(LOCAL_TZ, ambiguous='NaT', nonexistent='shift_forward').dt.as_unit('us')
+    ]
+    if aware.any():
+        # 不同偏移量先统一换算为 UTC，避免 pandas 因混合时区报错
+        aware_times = pd.to_datetime(values[aware], errors='coerce', format='mixed', utc=True)
+        parts.append(aware_times.dt.tz_convert(LOCAL_TZ).dt.as_unit('us'))
+    return pd.concat(parts).reindex(series.index)
+
+
+def _bulk_batch_size():
+    """批量写入大小：优先使用 settings.BULK_BATCH_SIZE，未配置时根据当前数据库后端选择"""
+    return settings.BULK_BATCH_SIZE or _BULK_BATCH_SIZES.get(connection.vendor, 1000)
+
+
+def _remove_upload(file_path):
+    """删除导入任务使用的临时上传文件"""
+    try:
+        os.remove(file_path)
+    except OSError:
+        pass
+
+
+def _build_student_records(chunk, offset, colleges, majors, grades, errors):
+    """
+    将一个数据块转换为学生记录
+
+    整列验证学院、专业、年级和学号，前 VALIDATION_LIMIT 行为无效行生成错误信息，其余行直接跳过无效数据
+
+    Args:
+        chunk: 数据块 DataFrame
+        offset: 数据块第一行在文件中的行序号（从0开始）
+        colleges / majors / grades: 代码（年份）到主键的映射
+        errors: 错误信息收集器
+
+    Returns:
+        tuple: (有效记录列表, 验证范围内的有效记录数)
+    """
+    validate_count = max(0, VALIDATION_LIMIT - offset)
+
+    college_codes = chunk['学院代码'].fillna('').astype(str).str.strip()
+    major_codes = chunk['专业代码'].fillna('').astype(str).str.strip()
+    student_ids = chunk['学号'].fillna('').astype(str).str.strip()
+    names = chunk['姓名'].fillna('').astype(str).str.strip()
+    grade_years = pd.to_numeric(chunk['年级'], errors='coerce')
+
+    college_valid = college_codes.isin(colleges.keys()).to_numpy()
+    major_valid = major_codes.isin(majors.keys()).to_numpy()
+    grade_format_valid = (grade_years.notna() & (grade_years % 1 == 0)).to_numpy()
+    grade_valid = grade_format_valid & grade_years.isin(grades.keys()).to_numpy()
+    student_id_valid = student_ids.str.len().between(1, 20).to_numpy()
+    valid = college_valid & major_valid & grade_valid & student_id_valid
+
+    # 验证范围内的无效行按 学院 -> 专业 -> 年级 -> 学号 的顺序报告第一个错误
+    for pos in (~valid[:validate_count]).nonzero()[0]:
+        line_no = offset + pos + 2
+        if not college_valid[pos]:
+            errors.append(f'第 {line_no} 行：学院代码 {college_codes.iat[pos]} 不存在')
+        elif not major_valid[pos]:
+            errors.append(f'第 {line_no} 行：专业代码 {major_codes.iat[pos]} 不存在')
+        elif not grade_format_valid[pos]:
+            errors.append(f'第 {line_no} 行：年级格式错误')
+        elif not grade_valid[pos]:
+            errors.append(f'第 {line_no} 行：年级 {int(grade_years.iat[pos])} 不存在')
+        else:
+            errors.append(f'第 {line_no} 行：学号格式错误')
+
+    valid_records = [
+        {
+            'name': name,
+            'student_id': student_id,
+            'college_id': colleges[college_code],
+            'major_id': majors[major_code],
+            'grade_id': grades[int(grade_year)]
+        }
+        for name, student_id, college_code, major_code, grade_year in zip(
+            names[valid], student_ids[valid], college_codes[valid], major_codes[valid], grade_years[valid]
+        )
+    ]
+    validated_count = int(valid[:validate_count].sum())
+
+    return valid_records, validated_count
+
+
+def _build_behavior_records(record_type, model_class, chunk, offset, students, errors):
+    """
+    将一个数据块转换为行为记录模型实例（未保存）
+
+    所有列整列转换和验证，前 VALIDATION_LIMIT 行为无效行生成错误信息，其余行直接跳过无效数据
+
+    Args:
+        record_type: 记录类型 (canteen, school-gate, dormitory, network, academic)
+        model_class: 记录对应的模型类
+        chunk: 数据块 DataFrame
+        offset: 数据块第一行在文件中的行序号（从0开始）
+        students: 学号到 Student 主键的映射
+        errors: 错误信息收集器
+
+    Returns:
+        tuple: (有效记录列表, 验证范围内的有效记录数)
+    """
+    validate_count = max(0, VALIDATION_LIMIT - offset)
+
+    # 学号整列映射为学生主键（不存在的学号为 NaN）
+    student_ids = chunk['学号'].astype(str).str.strip()
+    student_pks = student_ids.map(students)
+
+    # 按报告顺序排列的检查项：(无效行掩码, 错误信息)
+    checks = [(student_pks.isna(), None)]
+
+    if record_type in ['canteen', 'academic']:
+        value_column, value_field = ('消费金额', 'amount') if record_type == 'canteen' else ('平均成绩', 'average_score')
+        values = pd.to_numeric(chunk[value_column], errors='coerce')
+        checks.append((values.isna(), f'{value_column}格式错误'))
+        fields = {
+            'month': chunk['月份'].fillna('').astype(str).str.strip(),
+            value_field: values,
+        }
+
+    elif record_type in ['school-gate', 'dormitory']:
+        # 无法识别的进出方向映射为 NaN
+        timestamps = _parse_local_datetimes(chunk['时间'])
+        directions = chunk['进出方向'].astype(str).str.strip().map(_DIRECTION_MAP)
+        checks.append((timestamps.isna(), '时间格式错误'))
+        checks.append((directions.isna(), '进出方向格式错误'))
+        location_column, location_field = ('校门位置', 'gate_location') if record_type == 'school-gate' else ('寝室楼栋', 'building')
+        fields = {
+            'timestamp': timestamps,
+            location_field: chunk[location_column].fillna('').astype(str).str.strip(),
+            'direction': directions,
+        }
+
+    else:
+        start_times = _parse_local_datetimes(chunk['开始时间'])
+        end_times = _parse_local_datetimes(chunk['结束时间'])
+        checks.append((start_times.isna() | end_times.isna(), '时间格式错误'))
+        fields = {
+            'start_time': start_times,
+            'end_time': end_times,
+            'use_vpn': chunk['是否使用VPN'].astype(str).str.strip().str.lower().isin(_VPN_TRUE_SET),
+        }
+
+    invalid_masks = [mask.to_numpy() for mask, _ in checks]
+    valid = ~np.logical_or.reduce(invalid_masks)
+
+    # 验证范围内的无效行只报告第一个未通过的检查项
+    for pos in (~valid[:validate_count]).nonzero()[0]:
+        line_no = offset + pos + 2
+        for invalid, (_, message) in zip(invalid_masks, checks):
+            if invalid[pos]:
+                if message is None:
+                    message = f'学号 {student_ids.iat[pos]} 不存在'
+                errors.append(f'第 {line_no} 行：{message}')
+                break
+
+    validated_count = int(valid[:validate_count].sum())
+
+    records_df = pd.DataFrame({'student_id': student_pks, **fields})[valid]
+    records_df['student_id'] = records_df['student_id'].astype('int64')
+    if record_type in ['canteen', 'academic']:
+        # 同一（学生, 月份）只保留最后一条：减少逐行构建的记录数，
+        # 同时避免同一条 UPSERT 语句内冲突两次导致数据库报错
+        records_df = records_df.drop_duplicates(subset=['student_id', 'month'], keep='last')
+
+    # 逐行只构建模型对象
+    field_names = list(records_df.columns)
+    valid_records = [
+        model_class(**dict(zip(field_names, values)))
+        for values in zip(*(records_df[name] for name in field_names))
+    ]
+
+    return valid_records, validated_count
 
 
 @shared_task(bind=True, name='staff_dashboard.import_students_task')
-def import_students_task(self, user_id, file_content, filename):
+def import_students_task(self, user_id, file_path, filename):
     """
     异步导入学生基本信息
+
+    文件按块读取，每个数据块独立验证并在各自的事务中写入，
+    单个数据块失败不会回滚已导入的数据
     
     Args:
         self: Celery task instance
         user_id: 用户ID
-        file_content: 文件内容 (base64编码)
-        filename: 文件名
+        file_path: 上传文件的保存路径（任务结束后删除）
+        filename: 原始文件名
     
     Returns:
         dict: 导入结果
     """
     try:
         from .models import Student
-        from accounts.models import College, Major, Grade
         
         # 更新任务状态：正在解析文件
         self.update_state(
             state='PARSING',
             meta={'current': 10, 'total': 100, 'message': '正在解析文件...'}
         )
-        
-        # 解码并读取文件
-        file_data = base64.b64decode(file_content)
-        file_obj = io.BytesIO(file_data)
-        
-        try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(file_obj, encoding='utf-8')
-            elif filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_obj)
-            else:
-                return {
-                    'status': 'error',
-                    'message': '只支持 CSV 或 Excel 文件'
-                }
-        except Exception as parse_error:
+
+        if not filename.endswith(('.csv', '.xlsx', '.xls')):
             return {
                 'status': 'error',
-                'message': f'文件解析失败：{str(parse_error)}'
+                'message': '只支持 CSV 或 Excel 文件'
             }
         
-        # 验证必需列
         required_columns = ['姓名', '学号', '学院代码', '专业代码', '年级']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return {
-                'status': 'error',
-                'message': f'缺少必需列：{", ".join(missing_columns)}'
-            }
-        
-        total_rows = len(df)
         
         # 更新任务状态：开始验证
         self.update_state(
@@ -75,225 +377,326 @@ def import_students_task(self, user_id, file_content, filename):
         )
         
         # 预加载所有学院、专业、年级
-        colleges = {c.code: c for c in College.objects.all()}
-        majors = {m.code: m for m in Major.objects.all()}
-        grades = {g.year: g for g in Grade.objects.all()}
+        colleges = get_lookup_map('college')
+        majors = get_lookup_map('major')
+        grades = get_lookup_map('grade')
         
         # 收集错误
-        errors = []
-        valid_records = []
-        
-        # 限制验证前10000行数据，提升性能
-        validation_limit = min(10000, total_rows)
-        
-        idx: int
-        for idx, row in df.head(validation_limit).iterrows():
-            try:
-                # 验证学院
-                college_code = str(row['学院代码']).strip()
-                if college_code not in colleges:
-                    errors.append(f'第 {idx + 2} 行：学院代码 {college_code} 不存在')
-                    continue
+        errors = _ErrorCollector()
+        
+        batch_size = _bulk_batch_size()
+        imported_count = 0
+        updated_count = 0
+        offset = 0
+        progress = _ProgressReporter(self)
+        
+        with open(file_path, 'rb') as file_obj:
+            chunks = _iter_file_chunks(file_obj, filename, os.path.getsize(file_path), required_columns)
+            while True:
+                try:
+                    item = next(chunks, None)
+                except Exception as parse_error:
+                    if offset == 0:
+                        return {
+                            'status': 'error',
+                            'message': f'文件解析失败：{str(parse_error)}'
+                        }
+                    errors.append(f'第 {offset + 2} 行起：文件解析失败 - {str(parse_error)}')
+                    break
                 
-                # 验证专业
-                major_code = str(row['专业代码']).strip()
-                if major_code not in majors:
-                    errors.append(f'第 {idx + 2} 行：专业代码 {major_code} 不存在')
-                    continue
+                if item is None:
+                    break
+                chunk, read_fraction = item
                 
-                # 验证年级
-                try:
-                    grade_year = int(row['年级'])
-                    if grade_year not in grades:
-                        errors.append(f'第 {idx + 2} 行：年级 {grade_year} 不存在')
-                        continue
-                except ValueError:
-                    errors.append(f'第 {idx + 2} 行：年级格式错误')
-                    continue
+                if offset == 0:
+                    # 验证必需列
+                    missing_columns = [col for col in required_columns if col not in chunk.columns]
+                    if missing_columns:
+                        return {
+                            'status': 'error',
+                            'message': f'缺少必需列：{", ".join(missing_columns)}'
+                        }
                 
-                # 验证学号格式
-                student_id = str(row['学号']).strip()
-                if not student_id or len(student_id) > 20:
-                    errors.append(f'第 {idx + 2} 行：学号格式错误')
-                    continue
+                valid_records, validated_count = _build_student_records(
+                    chunk, offset, colleges, majors, grades, errors
+                )
+                
+                if offset == 0 and validated_count == 0:
+                    return {
+                        'status': 'error',
+                        'message': f'验证前{VALIDATION_LIMIT}行数据中没有有效的数据可导入',
+                        'errors': errors.items[:10],  # 只返回前10条错误
+                        'error_total': errors.total
+                    }
                 
-                valid_records.append({
-                    'name': str(row['姓名']).strip(),
-                    'student_id': student_id,
-                    'college': colleges[college_code],
-                    'major': majors[major_code],
-                    'grade': grades[grade_year]
-                })
+                offset += len(chunk)
                 
-            except Exception as e:
-                errors.append(f'第 {idx + 2} 行：数据处理失败 - {str(e)}')
+                # 同一学号在数据块中重复出现时以最后一条为准（与逐条 update_or_create 结果一致）
+                records_by_sid = {record['student_id']: record for record in valid_records}
+                
+                # 一次查询取出数据块中已存在的学生，分为新增和更新两部分；
+                # 已存在且信息未变化的学生不再写入数据库
+                existing_students = Student.objects.only(
+                    'student_id', 'name', 'college_id', 'major_id', 'grade_id'
+                ).in_bulk(list(records_by_sid), field_name='student_id')
+                
+                to_create = []
+                to_update = []
+                unchanged_count = 0
+                for student_id, record in records_by_sid.items():
+                    student = existing_students.get(student_id)
+                    if student is None:
+                        to_create.append(Student(**record))
+                    elif (student.name, student.college_id, student.major_id, student.grade_id) != (
+                        record['name'], record['college_id'], record['major_id'], record['grade_id']
+                    ):
+                        student.name = record['name']
+                        student.college_id = record['college_id']
+                        student.major_id = record['major_id']
+                        student.grade_id = record['grade_id']
+                        to_update.append(student)
+                    else:
+                        unchanged_count += 1
+                
+                # 每个数据块使用一个事务（不再为每批单独建立保存点），写入失败时整块回滚；
+                # 新增学生使用 UPSERT，查询后被并发导入抢先插入的学号改为更新，不会因唯一约束冲突丢失整块
+                try:
+                    with transaction.atomic():
+                        Student.objects.bulk_create(
+                            to_create,
+                            batch_size=batch_size,
+                            update_conflicts=True,
+                            unique_fields=['student_id'],
+                            update_fields=['name', 'college', 'major', 'grade'],
+                        )
+                        Student.objects.bulk_update(
+                            to_update, ['name', 'college', 'major', 'grade'], batch_size=batch_size
+                        )
+                except DatabaseError as e:
+                    errors.append(f'第 {offset - len(chunk) + 2} 行起的数据块中 {len(to_create) + len(to_update)} 条记录写入失败 - {str(e)}')
+                else:
+                    imported_count += len(to_create)
+                    updated_count += len(to_update) + unchanged_count
+                
+                # 更新任务状态：按已读取的文件比例报告进度（限制上报频率）
+                progress.update(
+                    30 + int(read_fraction * 70),
+                    f'已处理 {offset} 行，导入 {imported_count + updated_count} 条记录...'
+                )
         
-        if not valid_records:
+        if offset == 0:
             return {
                 'status': 'error',
-                'message': '验证前10000行数据中没有有效的数据可导入',
-                'errors': errors[:10]  # 只返回前10条错误
+                'message': '文件中没有数据'
             }
         
-        # 如果验证通过，处理剩余数据（跳过验证，直接导入）
-        if total_rows > validation_limit:
-            for idx in range(validation_limit, total_rows):
-                try:
-                    row = df.iloc[idx]
-                    college_code = str(row['学院代码']).strip()
-                    major_code = str(row['专业代码']).strip()
-                    grade_year = int(row['年级'])
-                    student_id = str(row['学号']).strip()
-                    
-                    # 跳过无效数据
-                    if college_code not in colleges or major_code not in majors or grade_year not in grades:
-                        continue
-                    
-                    valid_records.append({
-                        'name': str(row['姓名']).strip(),
-                        'student_id': student_id,
-                        'college': colleges[college_code],
-                        'major': majors[major_code],
-                        'grade': grades[grade_year]
-                    })
-                except:
-                    continue  # 跳过错误数据
-        
-        # 更新任务状态：开始导入
-        self.update_state(
-            state='IMPORTING',
-            meta={'current': 60, 'total': 100, 'message': f'正在导入 {len(valid_records)} 条记录...'}
-        )
-        
-        # 批量导入（使用 update_or_create）
-        imported_count = 0
-        updated_count = 0
-        
-        with transaction.atomic():
-            for record in valid_records:
-                student, created = Student.objects.update_or_create(
-                    student_id=record['student_id'],
-                    defaults={
-                        'name': record['name'],
-                        'college': record['college'],
-                        'major': record['major'],
-                        'grade': record['grade']
-                    }
-                )
-                if created:
-                    imported_count += 1
-                else:
-                    updated_count += 1
-        
         # 构建结果消息
         message_parts = []
         if imported_count > 0:
             message_parts.append(f'新增 {imported_count} 条')
         if updated_count > 0:
             message_parts.append(f'更新 {updated_count} 条')
-        if errors:
-            message_parts.append(f'跳过 {len(errors)} 条错误数据')
+        if errors.total:
+            message_parts.append(f'跳过 {errors.total} 条错误数据')
         
         return {
             'status': 'success',
             'message': '学生信息导入完成：' + '，'.join(message_parts),
             'records': imported_count + updated_count,
-            'errors': errors[:20] if errors else []  # 返回前20条错误供查看
+            'errors': errors.items[:20],  # 返回前20条错误供查看
+            'error_total': errors.total
         }
         
     except Exception as e:
-        import traceback
-        error_msg = traceback.format_exc()
-        print(f"导入学生信息错误: {error_msg}")
+        logger.exception('导入学生信息失败')
         return {
             'status': 'error',
             'message': f'导入失败：{str(e)}'
         }
+    finally:
+        _remove_upload(file_path)
+        # bulk_create 不触发 post_save 信号，需手动使学号映射缓存及学生人数统计缓存失效
+        invalidate_lookup_map('student')
+        invalidate_student_statistics()
+
+
+def _record_import_config(record_type):
+    """
+    获取记录类型对应的导入配置
+
+    Returns:
+        tuple: (必需列, 模型类, bulk_create 的 UPSERT 参数)，未知记录类型返回 None
+    """
+    from .models import (
+        CanteenConsumptionRecord, SchoolGateAccessRecord,
+        DormitoryAccessRecord, NetworkAccessRecord, AcademicRecord
+    )
+
+    if record_type == 'canteen':
+        required_columns = ['学号', '月份', '消费金额']
+        model_class = CanteenConsumptionRecord
+    elif record_type == 'school-gate':
+        required_columns = ['学号', '时间', '校门位置', '进出方向']
+        model_class = SchoolGateAccessRecord
+    elif record_type == 'dormitory':
+        required_columns = ['学号', '时间', '寝室楼栋', '进出方向']
+        model_class = DormitoryAccessRecord
+    elif record_type == 'network':
+        required_columns = ['学号', '开始时间', '结束时间', '是否使用VPN']
+        model_class = NetworkAccessRecord
+    elif record_type == 'academic':
+        required_columns = ['学号', '月份', '平均成绩']
+        model_class = AcademicRecord
+    else:
+        return None
+
+    # 有唯一约束的记录类型使用 UPSERT（INSERT ... ON CONFLICT DO UPDATE），
+    # 重复导入时直接更新数值，无需先删除旧记录
+    if record_type in ['canteen', 'academic']:
+        upsert_options = {
+            'update_conflicts': True,
+            'unique_fields': ['student', 'month'],
+            'update_fields': ['amount'] if record_type == 'canteen' else ['average_score'],
+        }
+    else:
+        upsert_options = {}
+
+    return required_columns, model_class, upsert_options
+
+
+def _copy_records(model_class, records):
+    """
+    使用 PostgreSQL 的 COPY FROM STDIN 批量写入记录（比多行 INSERT 快数倍）
+
+    记录以 CSV 格式写入内存缓冲区后一次性传给数据库，需在事务中调用
+    """
+    fields = [field for field in model_class._meta.concrete_fields if not field.primary_key]
+
+    buffer = io.StringIO()
+    # 除 None 外全部加引号：空字符串写为 ""，只有 None 写为空值（COPY 视为 NULL）
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+    for record in records:
+        writer.writerow([
+            field.get_db_prep_save(field.pre_save(record, True), connection)
+            for field in fields
+        ])
+
+    quote_name = connection.ops.quote_name
+    sql = 'COPY {} ({}) FROM STDIN WITH (FORMAT csv)'.format(
+        quote_name(model_class._meta.db_table),
+        ', '.join(quote_name(field.column) for field in fields)
+    )
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy'):
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        else:
+            # psycopg2
+            buffer.seek(0)
+            raw_cursor.copy_expert(sql, buffer)
+
+
+def _write_records(model_class, valid_records, upsert_options, source, errors):
+    """
+    在一个事务中写入一个数据块的记录
+
+    Args:
+        source: 数据块的描述（如“第 2 行起的数据块”），用于错误提示
+        errors: 错误信息收集器，写入失败的批次追加到其中
+
+    Returns:
+        int: 成功写入的记录数
+    """
+    # 整个数据块在一个事务中写入（不再为每批单独建立保存点），写入失败时整块回滚
+    try:
+        with transaction.atomic():
+            if not upsert_options and connection.vendor == 'postgresql' and len(valid_records) > COPY_MIN_RECORDS:
+                # 纯插入的大数据块在 PostgreSQL 上使用 COPY 一次写入
+                _copy_records(model_class, valid_records)
+            else:
+                model_class.objects.bulk_create(valid_records, batch_size=_bulk_batch_size(), **upsert_options)
+    except DatabaseError as e:
+        errors.append(f'{source}中 {len(valid_records)} 条记录写入失败 - {str(e)}')
+        return 0
+
+    return len(valid_records)
+
+
+def _records_import_result(record_type, imported_count, errors):
+    """构建行为记录导入任务的返回结果（导入已全部完成，同时使学生行为统计缓存失效）"""
+    invalidate_data_statistics()
+
+    record_type_names = {
+        'canteen': '食堂消费记录',
+        'school-gate': '校门门禁记录',
+        'dormitory': '寝室门禁记录',
+        'network': '网络访问记录',
+        'academic': '成绩记录'
+    }
+
+    message = f'{record_type_names.get(record_type, "记录")}导入完成：导入 {imported_count} 条'
+    if errors.total:
+        message += f'，跳过 {errors.total} 条错误数据'
+
+    return {
+        'status': 'success',
+        'message': message,
+        'records': imported_count,
+        'errors': errors.items[:20],
+        'error_total': errors.total
+    }
 
 
 @shared_task(bind=True, name='staff_dashboard.import_records_task')
-def import_records_task(self, user_id, record_type, file_content, filename):
+def import_records_task(self, user_id, record_type, file_path, filename):
     """
     异步导入各类行为记录
+
+    纯插入的记录类型（校门、寝室、网络）：第一个数据块（包含逐行详细验证的部分）在本任务中直接导入，
+    其余数据块保存为分片文件，通过 chord 分发给多个 Worker 并行导入，
+    最后由 aggregate_import_results_task 汇总结果（沿用本任务的任务ID）。
+    UPSERT 的记录类型（食堂、成绩）：所有数据块在本任务中按文件顺序逐块去重并写入，
+    保证同一键以文件中最后一行为准，也避免并行 UPSERT 相同的键互相死锁；
+    同一键出现在多个数据块中时每块各计一次导入条数。
+    每个数据块在各自的事务中写入，单个数据块失败不会回滚已导入的数据
     
     Args:
         self: Celery task instance
         user_id: 用户ID
         record_type: 记录类型 (canteen, school-gate, dormitory, network, academic)
-        file_content: 文件内容 (base64编码)
-        filename: 文件名
+        file_path: 上传文件的保存路径（任务结束后删除）
+        filename: 原始文件名
     
     Returns:
         dict: 导入结果
     """
+    shard_paths = []
     try:
-        from .models import (
-            Student, CanteenConsumptionRecord, SchoolGateAccessRecord,
-            DormitoryAccessRecord, NetworkAccessRecord, AcademicRecord
-        )
-        
         # 更新任务状态：正在解析文件
         self.update_state(
             state='PARSING',
             meta={'current': 10, 'total': 100, 'message': '正在解析文件...'}
         )
 
-        print(f"开始解析文件")
-        
-        # 解码并读取文件
-        file_data = base64.b64decode(file_content)
-        file_obj = io.BytesIO(file_data)
-        
-        try:
-            if filename.endswith('.csv'):
-                df = pd.read_csv(file_obj, encoding='utf-8')
-            elif filename.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file_obj)
-            else:
-                return {
-                    'status': 'error',
-                    'message': '只支持 CSV 或 Excel 文件'
-                }
-        except Exception as parse_error:
+        logger.info('开始解析文件 %s', filename)
+
+        if not filename.endswith(('.csv', '.xlsx', '.xls')):
             return {
                 'status': 'error',
-                'message': f'文件解析失败：{str(parse_error)}'
+                'message': '只支持 CSV 或 Excel 文件'
             }
-
-        print(f"开始验证前10000行数据")
         
         # 根据记录类型验证列和配置
-        if record_type == 'canteen':
-            required_columns = ['学号', '月份', '消费金额']
-            model_class = CanteenConsumptionRecord
-        elif record_type == 'school-gate':
-            required_columns = ['学号', '时间', '校门位置', '进出方向']
-            model_class = SchoolGateAccessRecord
-        elif record_type == 'dormitory':
-            required_columns = ['学号', '时间', '寝室楼栋', '进出方向']
-            model_class = DormitoryAccessRecord
-        elif record_type == 'network':
-            required_columns = ['学号', '开始时间', '结束时间', '是否使用VPN']
-            model_class = NetworkAccessRecord
-        elif record_type == 'academic':
-            required_columns = ['学号', '月份', '平均成绩']
-            model_class = AcademicRecord
-        else:
+        import_config = _record_import_config(record_type)
+        if import_config is None:
             return {
                 'status': 'error',
                 'message': '未知的记录类型'
             }
+        required_columns, model_class, upsert_options = import_config
         
-        # 验证必需列
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return {
-                'status': 'error',
-                'message': f'缺少必需列：{", ".join(missing_columns)}'
-            }
-        
-        total_rows = len(df)
-
         # 更新任务状态：开始验证
         self.update_state(
             state='VALIDATING',
@@ -301,296 +704,321 @@ def import_records_task(self, user_id, record_type, file_content, filename):
         )
         
         # 预加载所有学生（用学号作为键）
-        students = {s.student_id: s for s in Student.objects.all()}
-        
-        # 收集错误和有效记录
-        errors = []
-        valid_records = []
+        students = get_lookup_map('student')
         
-        direction_map = {'进': 'in', '出': 'out', 'in': 'in', 'out': 'out', '进入': 'in', '离开': 'out', '出去': 'out'}
+        # 收集错误
+        errors = _ErrorCollector()
         
-        # 限制验证前10000行数据，提升性能
-        validation_limit = min(10000, total_rows)
+        imported_count = 0
+        offset = 0
+        progress = _ProgressReporter(self)
+        # 待并行导入的分片：(分片文件路径, 分片第一行的行序号)
+        shards = []
+
+        logger.info('开始分块导入记录')
         
-        idx: int
-        for idx, row in df.head(validation_limit).iterrows():
-            try:
-                # 根据记录类型构建记录对象
-                # 验证学生是否存在
-                student_id = str(row['学号']).strip()
-                if student_id not in students:
-                    errors.append(f'第 {idx + 2} 行：学号 {student_id} 不存在')
+        with open(file_path, 'rb') as file_obj:
+            chunks = _iter_file_chunks(file_obj, filename, os.path.getsize(file_path), required_columns)
+            while True:
+                try:
+                    item = next(chunks, None)
+                except Exception as parse_error:
+                    if offset == 0:
+                        return {
+                            'status': 'error',
+                            'message': f'文件解析失败：{str(parse_error)}'
+                        }
+                    errors.append(f'第 {offset + 2} 行起：文件解析失败 - {str(parse_error)}')
+                    break
+                
+                if item is None:
+                    break
+                chunk, read_fraction = item
+                
+                if offset > 0 and not upsert_options:
+                    # 纯插入的后续数据块写入分片文件，稍后并行导入
+                    shard_path = f'{file_path}.part{len(shards)}.csv'
+                    shard_paths.append(shard_path)
+                    chunk.to_csv(shard_path, index=False, encoding='utf-8')
+                    shards.append((shard_path, offset))
+                    offset += len(chunk)
                     continue
                 
-                student = students[student_id]
+                # 验证必需列
+                missing_columns = [col for col in required_columns if col not in chunk.columns]
+                if missing_columns:
+                    return {
+                        'status': 'error',
+                        'message': f'缺少必需列：{", ".join(missing_columns)}'
+                    }
                 
-                if record_type == 'canteen':
-                    valid_records.append(CanteenConsumptionRecord(
-                        student=student,
-                        month=str(row['月份']).strip(),
-                        amount=float(row['消费金额'])
-                    ))
-                    
-                elif record_type == 'school-gate':
-                    dt = pd.to_datetime(row['时间'])
-                    if dt.tzinfo is None:
-                        dt = timezone.make_aware(dt, LOCAL_TZ)
-                    
-                    direction_raw = str(row['进出方向']).strip()
-                    direction = direction_map.get(direction_raw, direction_raw)
-                    if direction not in ['in', 'out']:
-                        errors.append(f'第 {idx + 2} 行：进出方向格式错误')
-                        continue
-                    
-                    valid_records.append(SchoolGateAccessRecord(
-                        student=student,
-                        timestamp=dt,
-                        gate_location=str(row['校门位置']).strip(),
-                        direction=direction
-                    ))
-                    
-                elif record_type == 'dormitory':
-                    dt = pd.to_datetime(row['时间'])
-                    if dt.tzinfo is None:
-                        dt = timezone.make_aware(dt, LOCAL_TZ)
-                    
-                    direction_raw = str(row['进出方向']).strip()
-                    direction = direction_map.get(direction_raw, direction_raw)
-                    if direction not in ['in', 'out']:
-                        errors.append(f'第 {idx + 2} 行：进出方向格式错误')
-                        continue
-                    
-                    valid_records.append(DormitoryAccessRecord(
-                        student=student,
-                        timestamp=dt,
-                        building=str(row['寝室楼栋']).strip(),
-                        direction=direction
-                    ))
-                    
-                elif record_type == 'network':
-                    start_dt = pd.to_datetime(row['开始时间'])
-                    if start_dt.tzinfo is None:
-                        start_dt = timezone.make_aware(start_dt, LOCAL_TZ)
-                    
-                    end_dt = pd.to_datetime(row['结束时间'])
-                    if end_dt.tzinfo is None:
-                        end_dt = timezone.make_aware(end_dt, LOCAL_TZ)
-                    
-                    use_vpn_raw = str(row['是否使用VPN']).strip().lower()
-                    use_vpn = use_vpn_raw in ['是', 'yes', 'true', '1']
-                    
-                    valid_records.append(NetworkAccessRecord(
-                        student=student,
-                        start_time=start_dt,
-                        end_time=end_dt,
-                        use_vpn=use_vpn
-                    ))
-                    
-                elif record_type == 'academic':
-                    valid_records.append(AcademicRecord(
-                        student=student,
-                        month=str(row['月份']).strip(),
-                        average_score=float(row['平均成绩'])
-                    ))
+                valid_records, validated_count = _build_behavior_records(
+                    record_type, model_class, chunk, offset, students, errors
+                )
+                
+                if offset == 0 and validated_count == 0:
+                    return {
+                        'status': 'error',
+                        'message': f'验证前{VALIDATION_LIMIT}行数据中没有有效的数据可导入',
+                        'errors': errors.items[:10],
+                        'error_total': errors.total
+                    }
+                
+                # 写入后即释放本数据块；UPSERT 的数据块按文件顺序依次写入，后写入的同键记录覆盖先前的
+                imported_count += _write_records(
+                    model_class, valid_records, upsert_options, f'第 {offset + 2} 行起的数据块', errors
+                )
+                offset += len(chunk)
                 
-            except KeyError as e:
-                errors.append(f'第 {idx + 2} 行：缺少列 {str(e)}')
-            except ValueError as e:
-                errors.append(f'第 {idx + 2} 行：数据格式错误 - {str(e)}')
-            except Exception as e:
-                errors.append(f'第 {idx + 2} 行：处理失败 - {str(e)}')
-        
-        if not valid_records:
+                # 更新任务状态：按已读取的文件比例报告进度（限制上报频率）
+                progress.update(
+                    30 + int(read_fraction * 70),
+                    f'已处理 {offset} 行，导入 {imported_count} 条记录...'
+                )
+        
+        if offset == 0:
             return {
                 'status': 'error',
-                'message': '验证前10000行数据中没有有效的数据可导入',
-                'errors': errors[:10]
+                'message': '文件中没有数据'
             }
-
-        print(f"开始处理剩余数据")
         
-        # 如果验证通过，处理剩余数据（跳过详细验证，直接导入）
-        if total_rows > validation_limit:
-            # 更新状态：正在处理剩余数据
+        if shards:
             self.update_state(
-                state='PROCESSING',
-                meta={'current': 40, 'total': 100, 'message': f'正在处理剩余 {total_rows - validation_limit} 行数据...'}
+                state='IMPORTING',
+                meta={
+                    'current': 50,
+                    'total': 100,
+                    'message': f'已导入 {imported_count} 条记录，剩余数据分为 {len(shards)} 个分片并行导入中...'
+                }
             )
-
-            # 优化：使用切片而非 iloc，性能提升10-100倍
-            remaining_df = df.iloc[validation_limit:]
-
-            # 预先过滤出存在的学生ID
-            remaining_df = remaining_df[remaining_df['学号'].astype(str).str.strip().isin(students.keys())]
-
-            # 根据记录类型批量处理
-            if record_type == 'canteen':
-                for _, row in remaining_df.iterrows():
-                    try:
-                        student_id = str(row['学号']).strip()
-                        valid_records.append(CanteenConsumptionRecord(
-                            student=students[student_id],
-                            month=str(row['月份']).strip(),
-                            amount=float(row['消费金额'])
-                        ))
-                    except:
-                        continue
-                        
-            elif record_type == 'school-gate':
-                # 批量时间转换（一次性转换所有时间，而非逐行转换）
-                remaining_df['时间_parsed'] = pd.to_datetime(remaining_df['时间'])
-                for _, row in remaining_df.iterrows():
-                    try:
-                        student_id = str(row['学号']).strip()
-                        dt = row['时间_parsed']
-                        if dt.tzinfo is None:
-                            dt = timezone.make_aware(dt, LOCAL_TZ)
-                        direction_raw = str(row['进出方向']).strip()
-                        direction = direction_map.get(direction_raw, direction_raw)
-                        if direction in ['in', 'out']:
-                            valid_records.append(SchoolGateAccessRecord(
-                                student=students[student_id],
-                                timestamp=dt,
-                                gate_location=str(row['校门位置']).strip(),
-                                direction=direction
-                            ))
-                    except:
-                        continue
-                        
-            elif record_type == 'dormitory':
-                # 批量时间转换
-                remaining_df['时间_parsed'] = pd.to_datetime(remaining_df['时间'])
-                for _, row in remaining_df.iterrows():
-                    try:
-                        student_id = str(row['学号']).strip()
-                        dt = row['时间_parsed']
-                        if dt.tzinfo is None:
-                            dt = timezone.make_aware(dt, LOCAL_TZ)
-                        direction_raw = str(row['进出方向']).strip()
-                        direction = direction_map.get(direction_raw, direction_raw)
-                        if direction in ['in', 'out']:
-                            valid_records.append(DormitoryAccessRecord(
-                                student=students[student_id],
-                                timestamp=dt,
-                                building=str(row['寝室楼栋']).strip(),
-                                direction=direction
-                            ))
-                    except:
-                        continue
-                        
-            elif record_type == 'network':
-                # 批量时间转换（一次性转换所有开始时间和结束时间）
-                remaining_df['开始时间_parsed'] = pd.to_datetime(remaining_df['开始时间'])
-                remaining_df['结束时间_parsed'] = pd.to_datetime(remaining_df['结束时间'])
-                for _, row in remaining_df.iterrows():
-                    try:
-                        student_id = str(row['学号']).strip()
-                        start_dt = row['开始时间_parsed']
-                        if start_dt.tzinfo is None:
-                            start_dt = timezone.make_aware(start_dt, LOCAL_TZ)
-                        end_dt = row['结束时间_parsed']
-                        if end_dt.tzinfo is None:
-                            end_dt = timezone.make_aware(end_dt, LOCAL_TZ)
-                        use_vpn_raw = str(row['是否使用VPN']).strip().lower()
-                        use_vpn = use_vpn_raw in ['是', 'yes', 'true', '1']
-                        valid_records.append(NetworkAccessRecord(
-                            student=students[student_id],
-                            start_time=start_dt,
-                            end_time=end_dt,
-                            use_vpn=use_vpn
-                        ))
-                    except:
-                        continue
-                        
-            elif record_type == 'academic':
-                for _, row in remaining_df.iterrows():
-                    try:
-                        student_id = str(row['学号']).strip()
-                        valid_records.append(AcademicRecord(
-                            student=students[student_id],
-                            month=str(row['月份']).strip(),
-                            average_score=float(row['平均成绩'])
-                        ))
-                    except:
-                        continue
-        
-        # 更新任务状态：开始导入
-        self.update_state(
-            state='IMPORTING',
-            meta={'current': 60, 'total': 100, 'message': f'正在导入 {len(valid_records)} 条记录...'}
-        )
-
-        print(f"开始导入记录")
-        
-        # 批量导入
-        batch_size = 500
-        imported_count = 0
-        
-        with transaction.atomic():
-            # 对于有唯一约束的记录类型，需要先删除重复数据
-            if record_type in ['canteen', 'academic']:
-                # 优化：收集所有学生ID和月份，使用分批删除
-                student_ids = set(record.student_id for record in valid_records)
-                months = set(record.month for record in valid_records)
-                
-                # 使用 student_id__in 和 month__in，一次性删除所有可能的重复
-                model_class.objects.filter(
-                    student_id__in=student_ids,
-                    month__in=months
-                ).delete()
-            
-            # 分批插入
-            for i in range(0, len(valid_records), batch_size):
-                batch = valid_records[i:i + batch_size]
-                model_class.objects.bulk_create(batch, batch_size=batch_size)
-                imported_count += len(batch)
-                
-                # 更新进度
-                progress = 60 + int((imported_count / len(valid_records)) * 40)
-                self.update_state(
-                    state='IMPORTING',
-                    meta={
-                        'current': progress,
-                        'total': 100,
-                        'message': f'已导入 {imported_count}/{len(valid_records)} 条记录...',
-                        'records': imported_count
-                    }
-                )
+            replacement = chord(
+                [import_records_shard_task.s(record_type, shard_path, shard_offset)
+                 for shard_path, shard_offset in shards],
+                aggregate_import_results_task.s(record_type, imported_count, errors.items, errors.total)
+            )
+            # 分片文件交由分片任务删除
+            shard_paths = []
+            return self.replace(replacement)
         
-        # 构建结果消息
-        record_type_names = {
-            'canteen': '食堂消费记录',
-            'school-gate': '校门门禁记录',
-            'dormitory': '寝室门禁记录',
-            'network': '网络访问记录',
-            'academic': '成绩记录'
-        }
-        
-        message = f'{record_type_names.get(record_type, "记录")}导入完成：导入 {imported_count} 条'
-        if errors:
-            message += f'，跳过 {len(errors)} 条错误数据'
-
-        return {
-            'status': 'success',
-            'message': message,
-            'records': imported_count,
-            'errors': errors[:20] if errors else []
-        }
+        return _records_import_result(record_type, imported_count, errors)
         
+    except Ignore:
+        # self.replace() 通过抛出 Ignore 结束当前任务，需原样抛出
+        raise
     except Exception as e:
-        import traceback
-        error_msg = traceback.format_exc()
-        print(f"导入记录错误: {error_msg}")
+        logger.exception('导入记录失败: record_type=%s', record_type)
         return {
             'status': 'error',
             'message': f'导入失败：{str(e)}'
         }
+    finally:
+        _remove_upload(file_path)
+        for shard_path in shard_paths:
+            _remove_upload(shard_path)
+
+
+@shared_task(name='staff_dashboard.import_records_shard_task')
+def import_records_shard_task(record_type, shard_path, offset):
+    """
+    导入一个纯插入类型的行为记录分片（由 import_records_task 分发，多个分片并行执行）
+
+    Args:
+        record_type: 记录类型
+        shard_path: 分片 CSV 文件路径（导入后删除）
+        offset: 分片第一行在原文件中的行序号（从0开始）
+
+    Returns:
+        dict: 分片导入结果 {'records': 导入条数, 'errors': 错误信息, 'error_total': 错误总数}
+    """
+    try:
+        required_columns, model_class, upsert_options = _record_import_config(record_type)
+        chunk = pd.read_csv(shard_path, encoding='utf-8', dtype=str)
+        students = get_lookup_map('student')
+
+        errors = _ErrorCollector()
+        valid_records, _ = _build_behavior_records(
+            record_type, model_class, chunk, offset, students, errors
+        )
+        imported_count = _write_records(
+            model_class, valid_records, upsert_options, f'第 {offset + 2} 行起的数据块', errors
+        )
+
+        return {'records': imported_count, 'errors': errors.items, 'error_total': errors.total}
+
+    except Exception as e:
+        logger.exception('导入记录分片失败: %s', shard_path)
+        return {
+            'records': 0,
+            'errors': [f'第 {offset + 2} 行起的数据分片导入失败 - {str(e)}'],
+            'error_total': 1
+        }
+    finally:
+        _remove_upload(shard_path)
+
+
+@shared_task(name='staff_dashboard.aggregate_import_results_task')
+def aggregate_import_results_task(shard_results, record_type, imported_count, error_items, error_total):
+    """
+    汇总各分片的导入结果（chord 回调）
+
+    Args:
+        shard_results: 各分片任务的返回结果列表
+        record_type: 记录类型
+        imported_count / error_items / error_total: 第一个数据块的导入条数、错误信息和错误总数
+
+    Returns:
+        dict: 导入结果（与 import_records_task 的返回格式相同）
+    """
+    errors = _ErrorCollector()
+    errors.merge(error_items, error_total)
+    for result in shard_results:
+        imported_count += result['records']
+        errors.merge(result['errors'], result['error_total'])
+
+    return _records_import_result(record_type, imported_count, errors)
+
+
+def _update_daily_statistics(model_class, statistics):
+    """
+    批量更新每日统计的统计数据
+
+    PostgreSQL 使用 copy_update（COPY 到临时表后一条 UPDATE），其他数据库使用 fast_update
+    （一条 UPDATE ... FROM VALUES 语句，不支持的数据库自动回退到 bulk_update）
+    """
+    fields = ['statistics_data', 'updated_at']
+    if connection.vendor == 'postgresql':
+        model_class.objects.copy_update(statistics, fields)
+    else:
+        model_class.objects.fast_update(statistics, fields, batch_size=_bulk_batch_size())
+
+
+def _statistics_calculator(data_type):
+    """获取统计类型对应的批量计算函数"""
+    from .core.batch_statistics import (
+        batch_calculate_canteen_stats,
+        batch_calculate_gate_stats,
+        batch_calculate_dormitory_stats,
+        batch_calculate_network_stats,
+        batch_calculate_academic_stats,
+    )
+
+    return {
+        'canteen': batch_calculate_canteen_stats,
+        'school_gate': batch_calculate_gate_stats,
+        'dormitory': batch_calculate_dormitory_stats,
+        'network': batch_calculate_network_stats,
+        'academic': batch_calculate_academic_stats,
+    }[data_type]
+
+
+def _calculate_daily_statistics(data_type, students, start, end):
+    """
+    计算一组学生在日期范围内某一统计类型的每日统计并写入数据库
+
+    Args:
+        data_type: 统计类型（DailyStatistics.data_type）
+        students: 学生列表
+        start / end: 统计日期范围（date，包含两端）
+
+    Returns:
+        tuple: (新增条数, 更新条数)
+    """
+    from .models import DailyStatistics
+    from datetime import timedelta
+    from django.utils import timezone as django_timezone
+
+    dates = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+    # 批量计算所有学生所有日期的统计（一次查询）
+    batch_results = _statistics_calculator(data_type)(students, start, end)
+
+    # 查询已存在的统计记录：只取（学生, 日期）到主键的映射，不加载完整记录。
+    # （学生, 日期）打包为一个整数作为键（学生主键左移 32 位 | 日期序数），比元组键节省内存
+    existing_stats = {
+        student_id << 32 | date.toordinal(): pk
+        for student_id, date, pk in DailyStatistics.objects.filter(
+            data_type=data_type,
+            student_id__in=[student.id for student in students],
+            date__gte=start,
+            date__lte=end
+        ).values_list('student_id', 'date', 'id').iterator(chunk_size=10000)
+    }
+
+    # bulk_update 不会触发 auto_now，更新时间需显式设置
+    updated_at = django_timezone.now()
+
+    # 批量创建统计记录（SQLite 的参数个数上限由 Django 在 bulk_create 内部自动处理）
+    batch_size = _bulk_batch_size()
+    # 待写入的记录累计到该数量后写入一次数据库
+    flush_size = settings.DAILY_STATS_FLUSH_SIZE
+    statistics_to_create = []
+    statistics_to_update = []
+    total_created = 0
+    total_updated = 0
+
+    # 整组学生的统计结果在一个事务中写入
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # 统计数据可随时重新计算，本事务提交时不必等待 WAL 落盘
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL synchronous_commit = OFF')
+
+        for student in students:
+            student_results = batch_results.get(student.id, {})
+
+            for date in dates:
+                stats_data = student_results.get(date, {})
+
+                # 检查是否已存在
+                pk = existing_stats.get(student.id << 32 | date.toordinal())
+                if pk is not None:
+                    # 更新现有记录（只需主键和待更新的字段）
+                    statistics_to_update.append(DailyStatistics(
+                        pk=pk,
+                        statistics_data=stats_data,
+                        updated_at=updated_at
+                    ))
+                else:
+                    # 创建新记录
+                    statistics_to_create.append(DailyStatistics(
+                        student_id=student.id,
+                        data_type=data_type,
+                        date=date,
+                        statistics_data=stats_data
+                    ))
+
+            # 每处理完一名学生的所有日期检查一次是否需要写入
+            # 批量保存 - 创建
+            if len(statistics_to_create) >= flush_size:
+                DailyStatistics.objects.bulk_create(statistics_to_create, batch_size=batch_size)
+                total_created += len(statistics_to_create)
+                statistics_to_create = []
+
+            # 批量保存 - 更新
+            if len(statistics_to_update) >= flush_size:
+                _update_daily_statistics(DailyStatistics, statistics_to_update)
+                total_updated += len(statistics_to_update)
+                statistics_to_update = []
+
+        # 保存剩余的记录
+        if statistics_to_create:
+            DailyStatistics.objects.bulk_create(statistics_to_create, batch_size=batch_size)
+        if statistics_to_update:
+            _update_daily_statistics(DailyStatistics, statistics_to_update)
+
+    total_created += len(statistics_to_create)
+    total_updated += len(statistics_to_update)
+
+    return total_created, total_updated
 
 
 @shared_task(bind=True, name='staff_dashboard.calculate_daily_statistics_task')
 def calculate_daily_statistics_task(self, start_date=None, end_date=None):
     """
     异步计算每日统计数据
+
+    按统计类型 × 学生分组拆分为多个子任务，通过 chord 分发给多个 Worker 并行计算，
+    最后由 aggregate_daily_statistics_task 汇总结果（沿用本任务的任务ID）
     
     Args:
         self: Celery task instance
@@ -601,18 +1029,7 @@ def calculate_daily_statistics_task(self, start_date=None, end_date=None):
         dict: 统计结果
     """
     try:
-        from .models import (
-            Student, DailyStatistics,
-            CanteenConsumptionRecord, SchoolGateAccessRecord,
-            DormitoryAccessRecord, NetworkAccessRecord, AcademicRecord
-        )
-        from .core.batch_statistics import (
-            batch_calculate_canteen_stats,
-            batch_calculate_gate_stats,
-            batch_calculate_dormitory_stats,
-            batch_calculate_network_stats,
-            batch_calculate_academic_stats,
-        )
+        from .models import Student
         from datetime import datetime, timedelta
         from django.utils import timezone as django_timezone
         
@@ -630,11 +1047,11 @@ def calculate_daily_statistics_task(self, start_date=None, end_date=None):
         
         if start_date:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
-            print(f"指定统计范围: {start} 至 {end}")
+            logger.info('指定统计范围: %s 至 %s', start, end)
         else:
             # 默认统计最近30天
             start = end - timedelta(days=30)
-            print(f"未指定开始日期，默认统计最近30天: {start} 至 {end}")
+            logger.info('未指定开始日期，默认统计最近30天: %s 至 %s', start, end)
         
         # 确保开始日期不晚于结束日期
         if start > end:
@@ -646,9 +1063,9 @@ def calculate_daily_statistics_task(self, start_date=None, end_date=None):
             meta={'current': 10, 'total': 100, 'message': f'正在加载学生数据和统计范围 {start} 至 {end}...'}
         )
         
-        # 获取所有学生（预加载到内存，避免重复查询）
-        students = list(Student.objects.all())
-        total_students = len(students)
+        # 只加载学生主键，子任务按主键分组加载各自的学生
+        student_ids = list(Student.objects.order_by('id').values_list('id', flat=True))
+        total_students = len(student_ids)
         
         if total_students == 0:
             return {
@@ -656,166 +1073,117 @@ def calculate_daily_statistics_task(self, start_date=None, end_date=None):
                 'message': '系统中没有学生数据'
             }
         
-        # 生成日期列表
-        dates = []
-        current_date = start
-        while current_date <= end:
-            dates.append(current_date)
-            current_date += timedelta(days=1)
-        
-        total_tasks = len(dates) * total_students * 5  # 5种数据类型
-        completed_tasks = 0
-        
-        # 统计类型配置（批量计算）
-        data_types_batch = [
-            ('canteen', batch_calculate_canteen_stats),
-            ('school_gate', batch_calculate_gate_stats),
-            ('dormitory', batch_calculate_dormitory_stats),
-            ('network', batch_calculate_network_stats),
-            ('academic', batch_calculate_academic_stats),
+        total_days = (end - start).days + 1
+        subtasks = [
+            calculate_daily_statistics_part_task.s(
+                data_type, start.isoformat(), end.isoformat(),
+                student_ids[i:i + STATISTICS_STUDENTS_PER_TASK]
+            )
+            for data_type in STATISTICS_DATA_TYPES
+            for i in range(0, total_students, STATISTICS_STUDENTS_PER_TASK)
         ]
         
+        logger.info(
+            '开始统计：%d天 × %d学生 × %d类型，拆分为 %d 个子任务',
+            total_days, total_students, len(STATISTICS_DATA_TYPES), len(subtasks)
+        )
+        
         # 更新任务状态：开始计算
         self.update_state(
             state='PROCESSING',
             meta={
                 'current': 15,
                 'total': 100,
-                'message': f'开始计算 {total_students} 名学生在 {len(dates)} 天的统计数据...'
+                'message': f'正在并行计算 {total_students} 名学生在 {total_days} 天的统计数据（{len(subtasks)} 个子任务）...'
             }
         )
         
-        # 批量创建统计记录
-        batch_size = 500  # SQLite 限制：单次查询最多999个参数，为安全起见使用500
-        update_batch_size = 100  # 更新操作需要更小的批次（每条记录需要2+个参数）
-        statistics_to_create = []
-        statistics_to_update = []
-        
-        # 查询已存在的统计记录（一次性加载到内存）
-        existing_stats = {}
-        for stat in DailyStatistics.objects.filter(
-            date__gte=start,
-            date__lte=end
-        ).select_related('student'):
-            key = (stat.student_id, stat.data_type, stat.date)
-            existing_stats[key] = stat
-        
-        print(f"开始统计：{len(dates)}天 × {total_students}学生 × 5类型 = {total_tasks}项任务")
-        print(f"已存在统计记录：{len(existing_stats)}条")
-        
-        # 优化：按数据类型分组处理，使用批量计算
-        for data_type, batch_calc_func in data_types_batch:
-            print(f"开始处理 {data_type} 统计，批量计算 {total_students} 名学生在 {len(dates)} 天的数据...")
-
-            # 批量计算所有学生所有日期的统计（一次查询）
-            try:
-                batch_results = batch_calc_func(students, start, end)
-                print(f"批量计算完成，共 {len(batch_results)} 名学生")
-            except Exception as e:
-                print(f"批量计算失败: {e}")
-                import traceback
-                traceback.print_exc()
-                continue
-            
-            # 处理每个学生每天的结果
-            for student in students:
-                student_results = batch_results.get(student.id, {})
-                
-                for date in dates:
-                    try:
-                        stats_data = student_results.get(date, {})
-                        
-                        # 检查是否已存在
-                        key = (student.id, data_type, date)
-                        if key in existing_stats:
-                            # 更新现有记录
-                            existing_stat = existing_stats[key]
-                            existing_stat.statistics_data = stats_data
-                            statistics_to_update.append(existing_stat)
-                        else:
-                            # 创建新记录
-                            statistics_to_create.append(DailyStatistics(
-                                student=student,
-                                data_type=data_type,
-                                date=date,
-                                statistics_data=stats_data
-                            ))
-                        
-                    except Exception as e:
-                        # 跳过错误，继续处理
-                        print(f"处理失败: student={student.student_id}, type={data_type}, date={date}, error={str(e)}")
-                    
-                    completed_tasks += 1
-                    
-                    # 每处理 1000 条记录更新一次进度（减少更新频率）
-                    if completed_tasks % 1000 == 0:
-                        progress = 15 + int((completed_tasks / total_tasks) * 70)
-                        self.update_state(
-                            state='PROCESSING',
-                            meta={
-                                'current': progress,
-                                'total': 100,
-                                'message': f'正在计算... {completed_tasks}/{total_tasks} ({progress-15}%)'
-                            }
-                        )
-                        # print(f"进度：{completed_tasks}/{total_tasks} ({int((completed_tasks/total_tasks)*100)}%)")
-                    
-                    # 批量保存 - 创建
-                    if len(statistics_to_create) >= batch_size:
-                        with transaction.atomic():
-                            DailyStatistics.objects.bulk_create(statistics_to_create, batch_size=batch_size)
-                        # print(f"批量创建 {len(statistics_to_create)} 条记录")
-                        statistics_to_create = []
-                    
-                    # 批量保存 - 更新（使用更小的批次）
-                    if len(statistics_to_update) >= update_batch_size:
-                        with transaction.atomic():
-                            DailyStatistics.objects.bulk_update(
-                                statistics_to_update,
-                                ['statistics_data', 'updated_at'],
-                                batch_size=update_batch_size
-                            )
-                        # print(f"批量更新 {len(statistics_to_update)} 条记录")
-                        statistics_to_update = []
-        
-        # 更新任务状态：保存剩余数据
-        self.update_state(
-            state='IMPORTING',
-            meta={'current': 90, 'total': 100, 'message': '正在保存统计结果...'}
-        )
-        
-        # 保存剩余的记录
-        with transaction.atomic():
-            if statistics_to_create:
-                DailyStatistics.objects.bulk_create(statistics_to_create, batch_size=batch_size)
-            if statistics_to_update:
-                # 分批更新，避免超过 SQLite 参数限制
-                for i in range(0, len(statistics_to_update), update_batch_size):
-                    batch = statistics_to_update[i:i + update_batch_size]
-                    DailyStatistics.objects.bulk_update(
-                        batch,
-                        ['statistics_data', 'updated_at'],
-                        batch_size=update_batch_size
-                    )
-        
-        total_created = len(statistics_to_create)
-        total_updated = len(statistics_to_update)
-        
-        return {
-            'status': 'success',
-            'message': f'每日统计计算完成：{start} 至 {end}，新增 {total_created} 条，更新 {total_updated} 条',
-            'records': total_created + total_updated,
-            'date_range': f'{start} 至 {end}',
-            'total_students': total_students,
-            'total_days': len(dates)
-        }
+        return self.replace(chord(
+            subtasks,
+            aggregate_daily_statistics_task.s(start.isoformat(), end.isoformat(), total_students, total_days)
+        ))
         
+    except Ignore:
+        # self.replace() 通过抛出 Ignore 结束当前任务，需原样抛出
+        raise
     except Exception as e:
-        import traceback
-        error_msg = traceback.format_exc()
-        print(f"每日统计计算错误: {error_msg}")
+        logger.exception('每日统计计算失败')
         return {
             'status': 'error',
             'message': f'统计计算失败：{str(e)}'
         }
 
+
+@shared_task(name='staff_dashboard.calculate_recent_daily_statistics_task')
+def calculate_recent_daily_statistics_task():
+    """
+    定时任务：重新计算最近两天（昨天和今天）的每日统计
+
+    由 Celery Beat 每天凌晨执行（见 settings.CELERY_BEAT_SCHEDULE），
+    使 api_data_statistics 直接读取 DailyStatistics 即可得到截至昨天的完整数据，
+    无需在请求中基于原始记录实时计算
+    """
+    from datetime import timedelta
+    from django.utils import timezone as django_timezone
+
+    today = django_timezone.localdate()
+    yesterday = today - timedelta(days=1)
+    calculate_daily_statistics_task.delay(yesterday.isoformat(), today.isoformat())
+
+
+@shared_task(name='staff_dashboard.calculate_daily_statistics_part_task')
+def calculate_daily_statistics_part_task(data_type, start_date, end_date, student_ids):
+    """
+    计算一组学生某一统计类型的每日统计（由 calculate_daily_statistics_task 分发，多个子任务并行执行）
+
+    Args:
+        data_type: 统计类型
+        start_date / end_date: 统计日期范围 (YYYY-MM-DD 字符串)
+        student_ids: 学生主键列表
+
+    Returns:
+        dict: {'created': 新增条数, 'updated': 更新条数, 'error': 失败原因（成功时为 None）}
+    """
+    try:
+        from .models import Student
+        from datetime import date
+
+        students = list(Student.objects.filter(id__in=student_ids).only('id'))
+        created, updated = _calculate_daily_statistics(
+            data_type, students, date.fromisoformat(start_date), date.fromisoformat(end_date)
+        )
+        return {'created': created, 'updated': updated, 'error': None}
+
+    except Exception as e:
+        logger.exception('%s 统计计算失败（%d 名学生）', data_type, len(student_ids))
+        return {'created': 0, 'updated': 0, 'error': f'{data_type}：{str(e)}'}
+
+
+@shared_task(name='staff_dashboard.aggregate_daily_statistics_task')
+def aggregate_daily_statistics_task(part_results, start_date, end_date, total_students, total_days):
+    """
+    汇总各子任务的统计结果（chord 回调）
+
+    Returns:
+        dict: 统计结果（与 calculate_daily_statistics_task 的返回格式相同）
+    """
+    total_created = sum(result['created'] for result in part_results)
+    total_updated = sum(result['updated'] for result in part_results)
+    failures = [result['error'] for result in part_results if result['error']]
+
+    # 每日统计已更新，使学生行为统计缓存失效
+    invalidate_data_statistics()
+
+    message = f'每日统计计算完成：{start_date} 至 {end_date}，新增 {total_created} 条，更新 {total_updated} 条'
+    if failures:
+        message += f'，{len(failures)} 个子任务失败'
+
+    return {
+        'status': 'success',
+        'message': message,
+        'records': total_created + total_updated,
+        'date_range': f'{start_date} 至 {end_date}',
+        'total_students': total_students,
+        'total_days': total_days,
+        'errors': failures[:20]
+    }
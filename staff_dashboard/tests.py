@@ -1,3 +1,301 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+import pandas as pd
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import College, Grade, Major, User
+
+from .cache import (
+    _STUDENT_STATISTICS_VERSION_KEY,
+    get_data_statistics_version,
+    get_student_statistics_version,
+    invalidate_data_statistics,
+    invalidate_student_statistics,
+)
+from .core import BATCH_AGGREGATORS, EMPTY_STATS, calculate_canteen_stats, calculate_network_stats
+from .models import CanteenConsumptionRecord, DailyStatistics, SchoolGateAccessRecord, Student
+from .tasks import (
+    LOCAL_TZ,
+    _ErrorCollector,
+    _build_behavior_records,
+    _build_student_records,
+    _parse_local_datetimes,
+)
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def _local(*args):
+    return pd.Timestamp(*args, tz=LOCAL_TZ)
+
+
+class ParseLocalDatetimesTests(SimpleTestCase):
+    """时间列批量解析：与逐行 pd.to_datetime 的结果一致"""
+
+    def test_mixed_formats_in_one_column(self):
+        parsed = _parse_local_datetimes(pd.Series([
+            '2025-02-01 08:00:00', '2025-02-01 08:00', '2025/02/02 09:00', '2025-02-03T10:30:00',
+        ]))
+        self.assertEqual(parsed.tolist(), [
+            _local(2025, 2, 1, 8), _local(2025, 2, 1, 8), _local(2025, 2, 2, 9), _local(2025, 2, 3, 10, 30),
+        ])
+
+    def test_offsets_converted_to_local_time(self):
+        parsed = _parse_local_datetimes(pd.Series([
+            '2025-02-01T00:00:00Z', '2025-02-01 08:00:00-05:00', '2025-02-01 08:00',
+        ]))
+        self.assertEqual(parsed.tolist(), [_local(2025, 2, 1, 8), _local(2025, 2, 1, 21), _local(2025, 2, 1, 8)])
+        self.assertEqual(str(parsed.dt.tz), 'Asia/Shanghai')
+
+    def test_invalid_values_are_nat(self):
+        parsed = _parse_local_datetimes(pd.Series(['bad', None, '', '2025-02-01 08:00'], index=[5, 6, 7, 8]))
+        self.assertEqual(parsed.isna().tolist(), [True, True, True, False])
+        self.assertEqual(parsed.index.tolist(), [5, 6, 7, 8])
+
+
+class BuildRecordsTests(SimpleTestCase):
+    """导入数据块的向量化构建：有效记录、错误信息与逐行处理时一致"""
+
+    def test_build_student_records(self):
+        chunk = pd.DataFrame({
+            '姓名': [' 张三 ', '李四', '王五', '赵六', '钱七'],
+            '学号': ['2400001', '2400002', '2400003', '2400004', ''],
+            '学院代码': ['CS', 'XX', 'CS', 'CS', 'CS'],
+            '专业代码': ['CS01', 'CS01', 'CS01', 'CS01', 'CS01'],
+            '年级': ['2024', '2024', 'abc', '2023', '2024'],
+        })
+        errors = _ErrorCollector()
+        records, validated_count = _build_student_records(
+            chunk, 0, {'CS': 1}, {'CS01': 2}, {2024: 3}, errors
+        )
+
+        self.assertEqual(records, [
+            {'name': '张三', 'student_id': '2400001', 'college_id': 1, 'major_id': 2, 'grade_id': 3},
+        ])
+        self.assertEqual(validated_count, 1)
+        self.assertEqual(errors.items, [
+            '第 3 行：学院代码 XX 不存在',
+            '第 4 行：年级格式错误',
+            '第 5 行：年级 2023 不存在',
+            '第 6 行：学号格式错误',
+        ])
+
+    def test_build_canteen_records_keeps_last_row_per_month(self):
+        chunk = pd.DataFrame({
+            '学号': ['2400001', '2400001', '2400002', '2400009', '2400001'],
+            '月份': ['2025-01', '2025-02', '2025-01', '2025-01', '2025-01'],
+            '消费金额': ['100', '200', 'abc', '50', '150.5'],
+        })
+        errors = _ErrorCollector()
+        records, validated_count = _build_behavior_records(
+            'canteen', CanteenConsumptionRecord, chunk, 0, {'2400001': 1, '2400002': 2}, errors
+        )
+
+        self.assertEqual(
+            [(record.student_id, record.month, float(record.amount)) for record in records],
+            [(1, '2025-02', 200.0), (1, '2025-01', 150.5)]
+        )
+        self.assertEqual(validated_count, 3)
+        self.assertEqual(errors.items, ['第 4 行：消费金额格式错误', '第 5 行：学号 2400009 不存在'])
+
+    def test_build_gate_records(self):
+        chunk = pd.DataFrame({
+            '学号': ['2400001', '2400001', '2400001'],
+            '时间': ['2025-02-01 08:00:00', '2025/02/01 22:30', 'bad'],
+            '校门位置': [' 东门 ', '西门', '南门'],
+            '进出方向': ['进', 'out', '进'],
+        })
+        errors = _ErrorCollector()
+        records, validated_count = _build_behavior_records(
+            'school-gate', SchoolGateAccessRecord, chunk, 0, {'2400001': 1}, errors
+        )
+
+        self.assertEqual(
+            [(record.timestamp, record.gate_location, record.direction) for record in records],
+            [(_local(2025, 2, 1, 8), '东门', 'in'), (_local(2025, 2, 1, 22, 30), '西门', 'out')]
+        )
+        self.assertEqual(validated_count, 2)
+        self.assertEqual(errors.items, ['第 4 行：时间格式错误'])
+
+
+class _StudentDataMixin:
+    @classmethod
+    def create_students(cls, count):
+        college = College.objects.create(name='计算机学院', code='CS')
+        major = Major.objects.create(name='软件工程', code='CS01', college=college)
+        grade = Grade.objects.create(year=2024, name='2024级')
+        return [
+            Student.objects.create(
+                name=f'学生{i}', student_id=f'24{i:05d}', college=college, major=major, grade=grade
+            )
+            for i in range(1, count + 1)
+        ]
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BatchAggregatorTests(_StudentDataMixin, TestCase):
+    """批量聚合统计：期望值与原逐学生实时计算的结果一致"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.s1, cls.s2, cls.s3 = cls.create_students(3)
+
+    def add_daily(self, student, data_type, day, **data):
+        DailyStatistics.objects.create(student=student, data_type=data_type, date=day, statistics_data=data)
+
+    def test_canteen(self):
+        for month, amount in [('2024-12', 999), ('2025-01', 100), ('2025-02', 200), ('2025-03', 300), ('2025-04', 400)]:
+            CanteenConsumptionRecord.objects.create(student=self.s1, month=month, amount=amount)
+        CanteenConsumptionRecord.objects.create(student=self.s2, month='2025-02', amount=80)
+
+        stats = BATCH_AGGREGATORS['canteen']([self.s1.id, self.s2.id, self.s3.id], date(2025, 1, 1), date(2025, 4, 30))
+
+        self.assertEqual(stats, {
+            self.s1.id: {'avg_expense': 250.0, 'expense_trend': 133.33, 'min_expense': 100.0},
+            self.s2.id: {'avg_expense': 80.0, 'expense_trend': 0, 'min_expense': 80.0},
+        })
+        self.assertEqual(
+            calculate_canteen_stats(self.s3, date(2025, 1, 1), date(2025, 4, 30)), dict(EMPTY_STATS['canteen'])
+        )
+
+    def test_access(self):
+        for data_type in ('school_gate', 'dormitory'):
+            self.add_daily(self.s1, data_type, date(2025, 1, 1), total_count=3, night_in_out_count=1, late_night_in_out_count=0)
+            self.add_daily(self.s1, data_type, date(2025, 1, 2), total_count=2, night_in_out_count=0, late_night_in_out_count=1)
+            self.add_daily(self.s1, data_type, date(2025, 5, 1), total_count=100)
+            self.add_daily(self.s2, data_type, date(2025, 1, 3), total_count=5)
+
+            stats = BATCH_AGGREGATORS[data_type]([self.s1.id, self.s2.id, self.s3.id], date(2025, 1, 1), date(2025, 1, 31))
+
+            self.assertEqual(stats, {
+                self.s1.id: {'total_count': 5, 'night_in_out_count': 1, 'late_night_in_out_count': 1},
+                self.s2.id: {'total_count': 5, 'night_in_out_count': 0, 'late_night_in_out_count': 0},
+            })
+
+    def test_network(self):
+        self.add_daily(self.s1, 'network', date(2025, 1, 1),
+                       vpn_usage_rate=50, night_usage_rate=1, late_night_usage_rate=0, avg_duration=60)
+        self.add_daily(self.s1, 'network', date(2025, 1, 2),
+                       vpn_usage_rate=0, night_usage_rate=0, late_night_usage_rate=1, avg_duration=40)
+        self.add_daily(self.s1, 'network', date(2025, 2, 1),
+                       vpn_usage_rate=100, night_usage_rate=1, late_night_usage_rate=1, avg_duration=30)
+
+        stats = BATCH_AGGREGATORS['network']([self.s1.id, self.s3.id], date(2025, 1, 1), date(2025, 2, 28))
+
+        self.assertEqual(stats, {self.s1.id: {
+            'vpn_usage_rate': 46.15,
+            'night_usage_rate': 3.39,
+            'late_night_usage_rate': 3.39,
+            'avg_duration': 65.0,
+            'max_duration': 100.0,
+        }})
+        self.assertEqual(
+            calculate_network_stats(self.s3, date(2025, 1, 1), date(2025, 2, 28)), dict(EMPTY_STATS['network'])
+        )
+
+    def test_academic(self):
+        for day, score in [(date(2025, 1, 10), 80), (date(2025, 1, 20), 90), (date(2025, 2, 10), 0),
+                           (date(2025, 3, 5), 70), (date(2025, 4, 5), 75)]:
+            self.add_daily(self.s1, 'academic', day, avg_score=score)
+        self.add_daily(self.s2, 'academic', date(2025, 1, 10), avg_score=0)
+
+        stats = BATCH_AGGREGATORS['academic']([self.s1.id, self.s2.id, self.s3.id], date(2025, 1, 1), date(2025, 4, 30))
+
+        self.assertEqual(stats, {
+            self.s1.id: {'avg_score': 76.67, 'score_trend': -6.45},
+            self.s2.id: {'avg_score': 0, 'score_trend': 0},
+        })
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class StudentListApiTests(_StudentDataMixin, TestCase):
+    """学生列表分页：has_next、键集游标与最后一页的总数推算"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.students = cls.create_students(25)
+        cls.user = User.objects.create_user(username='admin1', password='pass', role='admin')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('staff_dashboard:api_student_list'), {'page_size': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def student_ids(self, payload):
+        return [item['student_id'] for item in payload['data']]
+
+    def test_first_page(self):
+        payload = self.get_page()
+        self.assertEqual(self.student_ids(payload), [f'24{i:05d}' for i in range(1, 11)])
+        self.assertTrue(payload['has_next'])
+        self.assertEqual(payload['next_cursor'], '2400010')
+        self.assertNotIn('total', payload)
+
+    def test_first_page_with_total(self):
+        payload = self.get_page(with_total=1)
+        self.assertEqual(payload['total'], 25)
+        self.assertEqual(payload['total_pages'], 3)
+
+    def test_after_cursor(self):
+        payload = self.get_page(page=2, after='2400010')
+        self.assertEqual(self.student_ids(payload), [f'24{i:05d}' for i in range(11, 21)])
+        self.assertEqual(payload['next_cursor'], '2400020')
+
+        payload = self.get_page(page=3, after='2400020', order='asc')
+        self.assertEqual(self.student_ids(payload), [f'24{i:05d}' for i in range(21, 26)])
+        self.assertFalse(payload['has_next'])
+        self.assertNotIn('next_cursor', payload)
+        self.assertEqual(payload['total'], 25)
+
+    def test_after_cursor_descending(self):
+        payload = self.get_page(page=2, after='2400016', order='desc')
+        self.assertEqual(self.student_ids(payload), [f'24{i:05d}' for i in range(15, 5, -1)])
+
+    def test_last_page_total_without_count(self):
+        payload = self.get_page(page=3, order_by='name')
+        self.assertEqual(len(payload['data']), 5)
+        self.assertFalse(payload['has_next'])
+        self.assertEqual(payload['total'], 25)
+        self.assertEqual(payload['total_pages'], 3)
+
+    def test_invalid_order_by(self):
+        response = self.client.get(reverse('staff_dashboard:api_student_list'), {'order_by': 'password'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CacheVersionTests(SimpleTestCase):
+    """缓存版本号：失效时递增，被淘汰后重新初始化也不会回到旧版本号"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_bumps_version(self):
+        version = get_student_statistics_version()
+        self.assertEqual(get_student_statistics_version(), version)
+        invalidate_student_statistics()
+        self.assertEqual(get_student_statistics_version(), version + 1)
+
+    def test_versions_are_independent(self):
+        data_version = get_data_statistics_version()
+        invalidate_student_statistics()
+        self.assertEqual(get_data_statistics_version(), data_version)
+        invalidate_data_statistics()
+        self.assertEqual(get_data_statistics_version(), data_version + 1)
+
+    def test_evicted_version_is_not_reused(self):
+        seen = {get_student_statistics_version()}
+        invalidate_student_statistics()
+        seen.add(get_student_statistics_version())
+
+        cache.delete(_STUDENT_STATISTICS_VERSION_KEY)
+        self.assertNotIn(get_student_statistics_version(), seen)
+
+        cache.delete(_STUDENT_STATISTICS_VERSION_KEY)
+        invalidate_student_statistics()
+        self.assertNotIn(get_student_statistics_version(), seen)
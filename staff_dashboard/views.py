@@ -1,29 +1,77 @@
 from typing import Any
 
-from django.http import HttpResponse, JsonResponse, HttpRequest
+from django.http import HttpResponse, HttpRequest, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Value, Window
 from django.utils import timezone
 from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
 from .models import Student
 from accounts.models import College, Major, Grade
-from .core import (
-    calculate_canteen_stats,
-    calculate_gate_stats,
-    calculate_dormitory_stats,
-    calculate_network_stats,
-    calculate_academic_stats,
-)
+from .cache import get_data_statistics_version, get_student_statistics_version
+from .core import BATCH_AGGREGATORS, EMPTY_STATS
 import hashlib
-import json
-from datetime import datetime, timedelta
+import orjson
+from collections import namedtuple
+from functools import wraps
+from datetime import date, timedelta
+
+
+# 学生人数统计缓存时间（秒），版本号见 cache.py
+STUDENT_STATISTICS_CACHE_TIMEOUT = 300
+
+# 数据分析页筛选选项缓存时间（秒）
+ANALYSIS_FILTERS_CACHE_TIMEOUT = 900
+
+# 学生行为统计缓存：按（数据表, 日期范围, 学生）粒度缓存，不同筛选条件和用户共用，版本号见 cache.py
+DATA_STATISTICS_CACHE_TIMEOUT = 3600
+
+
+STAFF_ROLES = frozenset({'counselor', 'admin'})
 
 
 def check_staff_permission(user) -> bool:
     """检查用户是否为工作人员（辅导员或管理员）"""
-    return user.role in ['counselor', 'admin']
+    return user.role in STAFF_ROLES
+
+
+def staff_required(view_func):
+    """工作台页面装饰器：要求登录，且非工作人员时提示并跳转首页"""
+    @login_required
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not check_staff_permission(request.user):
+            messages.error(request, '您没有权限访问工作台')
+            return redirect('home')
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+CounselorScope = namedtuple('CounselorScope', 'college_ids major_ids grade_ids')
+
+
+def get_counselor_scope(user) -> CounselorScope:
+    """
+    获取辅导员负责的学院/专业/年级ID列表
+    三个多对多关系通过 UNION ALL 合并为一次查询；结果缓存在 user 实例上，
+    同一请求内多次调用只查询一次数据库
+    """
+    scope = getattr(user, '_counselor_scope', None)
+    if scope is None:
+        rows = user.managed_colleges.order_by().values_list('id', Value(0)).union(
+            user.managed_majors.order_by().values_list('id', Value(1)),
+            user.managed_grades.order_by().values_list('id', Value(2)),
+            all=True,
+        )
+        ids = ([], [], [])
+        for pk, kind in rows:
+            ids[kind].append(pk)
+        # 排序后作为缓存键的一部分时与 UNION ALL 的返回顺序无关
+        scope = CounselorScope(*(sorted(group) for group in ids))
+        user._counselor_scope = scope
+    return scope
 
 
 def filter_students_by_permission(user, queryset=None):
@@ -41,46 +89,38 @@ def filter_students_by_permission(user, queryset=None):
     
     # 辅导员只能查看自己负责的数据（交集逻辑）
     if user.role == 'counselor':
-        managed_colleges = user.managed_colleges.all()
-        managed_majors = user.managed_majors.all()
-        managed_grades = user.managed_grades.all()
+        scope = get_counselor_scope(user)
         
-        # 使用交集逻辑：必须同时满足所有已分配的负责范围
-        if managed_colleges.exists():
-            queryset = queryset.filter(college__in=managed_colleges)
+        # 如果没有分配任何责任范围，返回空查询集
+        if not (scope.college_ids or scope.major_ids or scope.grade_ids):
+            return queryset.none()
         
-        if managed_majors.exists():
-            queryset = queryset.filter(major__in=managed_majors)
+        # 使用交集逻辑：必须同时满足所有已分配的负责范围
+        # 按外键ID过滤不产生连接，无需 distinct()
+        if scope.college_ids:
+            queryset = queryset.filter(college_id__in=scope.college_ids)
         
-        if managed_grades.exists():
-            queryset = queryset.filter(grade__in=managed_grades)
+        if scope.major_ids:
+            queryset = queryset.filter(major_id__in=scope.major_ids)
         
-        # 如果没有分配任何责任范围，返回空查询集
-        if not (managed_colleges.exists() or managed_majors.exists() or managed_grades.exists()):
-            return queryset.none()
+        if scope.grade_ids:
+            queryset = queryset.filter(grade_id__in=scope.grade_ids)
         
-        return queryset.distinct()
+        return queryset
     
     # 其他角色无权限
     return queryset.none()
 
 
-@login_required
+@staff_required
 def dashboard_home(request) -> HttpResponse:
     """工作台首页，默认跳转到数据上传"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
     return redirect('staff_dashboard:data_upload')
 
 
-@login_required
+@staff_required
 def data_upload(request) -> HttpResponse:
     """数据上传页面"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
-    
     context = {
         'current_page': 'data_upload',
         'navbar_page': 'dashboard',
@@ -88,39 +128,54 @@ def data_upload(request) -> HttpResponse:
     return render(request, 'staff_dashboard/data_upload.html', context)
 
 
-@login_required
+@staff_required
 def data_analysis(request) -> HttpResponse:
     """数据分析页面"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
-    
-    # 获取用户有权限的数据的筛选选项
-    students = filter_students_by_permission(request.user)
-    
-    # 获取所有可用的筛选项（基于权限）
-    colleges = College.objects.filter(data_students__in=students).distinct().order_by('code')
-    majors = Major.objects.filter(data_students__in=students).distinct().order_by('code')
-    grades = Grade.objects.filter(data_students__in=students).distinct().order_by('-year')
+    # 筛选选项按用户及其负责范围缓存，学生、学院、专业、年级数据变更时随学生人数统计缓存一起失效
+    user = request.user
+    scope = list(get_counselor_scope(user)) if user.role == 'counselor' else None
+    cache_key = _cache_key('analysis_filters_', {
+        'version': get_student_statistics_version(),
+        'user_id': user.id,
+        'scope': scope,
+    })
+    filter_options = cache.get(cache_key)
+    if filter_options is None:
+        # 获取用户有权限的数据的筛选选项
+        students = filter_students_by_permission(user)
+        
+        # 获取所有可用的筛选项（基于权限）
+        # 一次分组查询取出学生涉及的学院/专业/年级ID组合及人数，避免三次连接学生表去重
+        groups = list(
+            students.order_by()
+            .values_list('college_id', 'major_id', 'grade_id')
+            .annotate(count=Count('id'))
+        )
+        filter_options = {
+            'colleges': list(College.objects.filter(
+                id__in={row[0] for row in groups}
+            ).order_by('code').values('id', 'name')),
+            'majors': list(Major.objects.filter(
+                id__in={row[1] for row in groups}
+            ).order_by('code').values('id', 'name')),
+            'grades': list(Grade.objects.filter(
+                id__in={row[2] for row in groups}
+            ).order_by('-year').values('id', 'name')),
+            'total_students': sum(row[3] for row in groups),
+        }
+        cache.set(cache_key, filter_options, ANALYSIS_FILTERS_CACHE_TIMEOUT)
     
     context = {
         'current_page': 'data_analysis',
         'navbar_page': 'dashboard',
-        'colleges': colleges,
-        'majors': majors,
-        'grades': grades,
-        'total_students': students.count(),
+        **filter_options,
     }
     return render(request, 'staff_dashboard/data_analysis.html', context)
 
 
-@login_required
+@staff_required
 def public_opinion(request) -> HttpResponse:
     """舆论监控页面"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
-    
     context = {
         'current_page': 'public_opinion',
         'navbar_page': 'dashboard',
@@ -128,13 +183,9 @@ def public_opinion(request) -> HttpResponse:
     return render(request, 'staff_dashboard/public_opinion.html', context)
 
 
-@login_required
+@staff_required
 def monthly_report(request) -> HttpResponse:
     """每月报表页面"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
-    
     context = {
         'current_page': 'monthly_report',
         'navbar_page': 'dashboard',
@@ -142,13 +193,9 @@ def monthly_report(request) -> HttpResponse:
     return render(request, 'staff_dashboard/monthly_report.html', context)
 
 
-@login_required
+@staff_required
 def data_analysis_help(request) -> HttpResponse:
     """数据分析帮助页面"""
-    if not check_staff_permission(request.user):
-        messages.error(request, '您没有权限访问工作台')
-        return redirect('home')
-    
     context = {
         'current_page': 'data_analysis',
         'navbar_page': 'dashboard',
@@ -156,25 +203,64 @@ def data_analysis_help(request) -> HttpResponse:
     return render(request, 'staff_dashboard/data_analysis_help.html', context)
 
 
-def _from_one_student_stat_to_dict(student: Student) -> dict[str, Any]:
+_DJANGO_JSON_ENCODER = DjangoJSONEncoder()
+
+
+def _json_default(value: Any) -> Any:
+    """orjson 不能直接序列化的值（Decimal、惰性翻译字符串、timedelta 等）按 DjangoJSONEncoder 的规则转换"""
+    return _DJANGO_JSON_ENCODER.default(value)
+
+
+def _json_response(payload: dict[str, Any], status: int = 200) -> HttpResponse:
+    """使用 orjson 序列化 JSON 响应（numpy 标量按数值输出）"""
+    return HttpResponse(
+        orjson.dumps(payload, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY),
+        content_type='application/json',
+        status=status,
+    )
+
+
+def _json_line(item: dict[str, Any]) -> bytes:
+    """序列化为一行 NDJSON"""
+    return orjson.dumps(
+        item, default=_json_default, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+def _cache_key(prefix: str, key_data: dict[str, Any]) -> str:
+    """根据参数字典生成稳定的缓存键（按键排序序列化后取 BLAKE2b 摘要）"""
+    raw = orjson.dumps(key_data, option=orjson.OPT_SORT_KEYS)
+    return prefix + hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+_STUDENT_VALUES_FIELDS = (
+    'id', 'student_id', 'name',
+    'college_id', 'college__name', 'college__code',
+    'major_id', 'major__name', 'major__code',
+    'grade_id', 'grade__name', 'grade__year',
+)
+
+
+def _from_student_values_to_dict(row: dict[str, Any]) -> dict[str, Any]:
+    """将 values(*_STUDENT_VALUES_FIELDS) 的扁平行转换为学院/专业/年级嵌套的学生数据"""
     return {
-        'id': student.id,
-        'student_id': student.student_id,
-        'name': student.name,
+        'id': row['id'],
+        'student_id': row['student_id'],
+        'name': row['name'],
         'college': {
-            'id': student.college.id,
-            'name': student.college.name,
-            'code': student.college.code,
+            'id': row['college_id'],
+            'name': row['college__name'],
+            'code': row['college__code'],
         },
         'major': {
-            'id': student.major.id,
-            'name': student.major.name,
-            'code': student.major.code,
+            'id': row['major_id'],
+            'name': row['major__name'],
+            'code': row['major__code'],
         },
         'grade': {
-            'id': student.grade.id,
-            'name': student.grade.name,
-            'year': student.grade.year,
+            'id': row['grade_id'],
+            'name': row['grade__name'],
+            'year': row['grade__year'],
         },
     }
 
@@ -196,6 +282,7 @@ def _from_request_to_query_info(request: HttpRequest):
     if grade_id:
         queryset = queryset.filter(grade_id=grade_id)
 
+    # PostgreSQL 下 icontains 生成 UPPER(列::text) LIKE UPPER(...)，可走 UPPER(姓名/学号) 上的 pg_trgm GIN 索引
     search = request.GET.get('search', '').strip()
     if search:
         queryset = queryset.filter(
@@ -220,8 +307,18 @@ def _get_page_info(request: HttpRequest):
     return page, page_size, start, end
 
 
+# 学生列表排序参数到模型字段的映射
+_STUDENT_LIST_ORDER_FIELDS = {
+    'student_id': 'student_id',
+    'name': 'name',
+    'college': 'college__code',
+    'major': 'major__code',
+    'grade': 'grade__year',
+}
+
+
 @login_required
-def api_student_list(request) -> JsonResponse:
+def api_student_list(request) -> HttpResponse:
     """
     学生列表API，支持筛选、排序、分页
     GET参数：
@@ -233,9 +330,12 @@ def api_student_list(request) -> JsonResponse:
     - order: 排序方向 (asc, desc)
     - page: 页码
     - page_size: 每页数量
+    - with_total: 为 1 时返回总数与总页数（需额外一次 COUNT 查询）
+    - after: 按学号排序时上一页最后一名学生的学号（键集分页，可选；响应中的 next_cursor）
+    - stream: 为 1 时忽略分页，以 NDJSON（每行一名学生）流式返回全部符合条件的学生
     """
     if not check_staff_permission(request.user):
-        return JsonResponse({'error': '无权限访问'}, status=403)
+        return _json_response({'error': '无权限访问'}, status=403)
     
     queryset, *_ = _from_request_to_query_info(request)
     
@@ -243,117 +343,228 @@ def api_student_list(request) -> JsonResponse:
     order_by = request.GET.get('order_by', 'student_id')
     order = request.GET.get('order', 'asc')
     
-    # 映射排序字段
-    order_mapping = {
-        'student_id': 'student_id',
-        'name': 'name',
-        'college': 'college__code',
-        'major': 'major__code',
-        'grade': 'grade__year',
-    }
-    
-    order_field = order_mapping.get(order_by, 'student_id')
+    order_field = _STUDENT_LIST_ORDER_FIELDS.get(order_by)
+    if order_field is None:
+        return _json_response({'error': f'无效的排序字段: {order_by}'}, status=400)
     if order == 'desc':
         order_field = '-' + order_field
     
     queryset = queryset.order_by(order_field)
     
-    # 统计总数
-    total = queryset.count()
+    if request.GET.get('stream') == '1':
+        # 流式导出：边查询边序列化输出，内存占用与学生数无关
+        rows = queryset.values(*_STUDENT_VALUES_FIELDS).iterator(chunk_size=500)
+        return StreamingHttpResponse(
+            (_json_line(_from_student_values_to_dict(row)) for row in rows),
+            content_type='application/x-ndjson',
+        )
     
-    # 分页
+    # 分页（多取一行用于判断是否有下一页）
     page, page_size, start, end = _get_page_info(request)
     
-    students = queryset.select_related('college', 'major', 'grade')[start:end]
+    # 按学号排序且带游标时使用键集分页：从游标之后开始读取，避免 OFFSET 扫描并丢弃前面的行
+    keyset = order_by == 'student_id'
+    after = request.GET.get('after')
+    with_total = request.GET.get('with_total') == '1'
+    fields = _STUDENT_VALUES_FIELDS
+    if keyset and after:
+        lookup = 'student_id__lt' if order == 'desc' else 'student_id__gt'
+        page_queryset = queryset.filter(**{lookup: after})
+        bounds = slice(0, page_size + 1)
+    else:
+        page_queryset = queryset
+        bounds = slice(start, end + 1)
+        if with_total:
+            # 总数通过窗口函数 COUNT(*) OVER () 随分页数据一并返回，省去单独的 COUNT 查询
+            page_queryset = page_queryset.annotate(window_total=Window(Count('*')))
+            fields += ('window_total',)
+    
+    # 直接取扁平字段，避免每行实例化学生及关联的学院/专业/年级模型
+    rows = list(page_queryset.values(*fields)[bounds])
+    has_next = len(rows) > page_size
     
     # 构建返回数据
-    data = []
-    for student in students:
-        data.append(_from_one_student_stat_to_dict(student))
+    data = [_from_student_values_to_dict(row) for row in rows[:page_size]]
     
-    return JsonResponse({
+    response = {
         'success': True,
         'data': data,
-        'total': total,
         'page': page,
         'page_size': page_size,
-        'total_pages': (total + page_size - 1) // page_size,
-    })
+        'has_next': has_next,
+    }
+    if keyset and has_next:
+        response['next_cursor'] = data[-1]['student_id']
+    
+    # 统计总数：已到最后一页时可直接推算，否则仅在客户端要求时执行 COUNT
+    if not has_next and (data or page == 1):
+        total = start + len(data)
+    elif with_total:
+        total = rows[0]['window_total'] if rows and 'window_total' in rows[0] else queryset.count()
+    else:
+        total = None
+    if total is not None:
+        response['total'] = total
+        response['total_pages'] = (total + page_size - 1) // page_size
+    
+    return _json_response(response)
 
 
 @login_required
-def api_student_statistics(request) -> JsonResponse:
+def api_student_statistics(request) -> HttpResponse:
     """
     学生统计API，按学院/专业/年级统计人数
     GET参数：
-    - group_by: 分组字段 (college, major, grade)
+    - group_by: 分组字段 (college, major, grade, all)；all 时 data 为包含三种分组的字典
     - college: 筛选学院ID
     - major: 筛选专业ID
     - grade: 筛选年纭 ID
     """
     if not check_staff_permission(request.user):
-        return JsonResponse({'error': '无权限访问'}, status=403)
+        return _json_response({'error': '无权限访问'}, status=403)
 
-    queryset, *_ = _from_request_to_query_info(request)
+    queryset, college_id, major_id, grade_id, search = _from_request_to_query_info(request)
     
     # 分组统计
     group_by = request.GET.get('group_by', 'college')
+    if group_by not in ('college', 'major', 'grade', 'all'):
+        return _json_response({'error': '无效的分组字段'}, status=400)
+    
+    # 三种分组由同一次查询得出，缓存键与 group_by 无关，各分组请求共用同一份缓存；
+    # 键中包含辅导员的负责范围（已在筛选学生时读取），范围调整后不会读到旧范围的统计
+    user = request.user
+    version = get_student_statistics_version()
+    cache_key = _cache_key('student_statistics_', {
+        'version': version,
+        'user_id': user.id,
+        'scope': list(get_counselor_scope(user)) if user.role == 'counselor' else None,
+        'college': college_id,
+        'major': major_id,
+        'grade': grade_id,
+        'search': search,
+    })
     
-    if group_by == 'college':
-        stats = queryset.values(
-            'college__id', 'college__name', 'college__code'
-        ).annotate(
-            count=Count('id')
-        ).order_by('college__code')
-        
-        data = [{
-            'id': item['college__id'],
-            'name': item['college__name'],
-            'code': item['college__code'],
-            'count': item['count'],
-        } for item in stats]
-        
-    elif group_by == 'major':
-        stats = queryset.values(
-            'major__id', 'major__name', 'major__code', 'major__college__name'
-        ).annotate(
-            count=Count('id')
-        ).order_by('major__code')
-        
-        data = [{
-            'id': item['major__id'],
-            'name': item['major__name'],
-            'code': item['major__code'],
-            'college': item['major__college__name'],
-            'count': item['count'],
-        } for item in stats]
-        
-    elif group_by == 'grade':
-        stats = queryset.values(
-            'grade__id', 'grade__name', 'grade__year'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-grade__year')
-        
-        data = [{
-            'id': item['grade__id'],
-            'name': item['grade__name'],
-            'year': item['grade__year'],
-            'count': item['count'],
-        } for item in stats]
-    else:
-        return JsonResponse({'error': '无效的分组字段'}, status=400)
+    statistics = cache.get(cache_key)
+    if statistics is None:
+        statistics = _aggregate_student_statistics(queryset)
+        cache.set(cache_key, statistics, STUDENT_STATISTICS_CACHE_TIMEOUT)
     
-    return JsonResponse({
+    return _json_response({
         'success': True,
-        'data': data,
-        'total': queryset.count(),
+        'data': statistics if group_by == 'all' else statistics[group_by],
+        'total': sum(item['count'] for item in statistics['college']),
         'group_by': group_by,
     })
 
 
+def _aggregate_student_statistics(queryset) -> dict[str, list[dict[str, Any]]]:
+    """
+    按学院/专业/年级分组统计学生人数
+    一次按（学院, 专业, 年级）组合分组查询，再在 Python 中汇总出三种分组的结果
+    """
+    rows = queryset.order_by().values(
+        'college__id', 'college__name', 'college__code',
+        'major__id', 'major__name', 'major__code', 'major__college__name',
+        'grade__id', 'grade__name', 'grade__year',
+    ).annotate(count=Count('id'))
+    
+    colleges, majors, grades = {}, {}, {}
+    for row in rows:
+        colleges.setdefault(row['college__id'], {
+            'id': row['college__id'],
+            'name': row['college__name'],
+            'code': row['college__code'],
+            'count': 0,
+        })['count'] += row['count']
+        majors.setdefault(row['major__id'], {
+            'id': row['major__id'],
+            'name': row['major__name'],
+            'code': row['major__code'],
+            'college': row['major__college__name'],
+            'count': 0,
+        })['count'] += row['count']
+        grades.setdefault(row['grade__id'], {
+            'id': row['grade__id'],
+            'name': row['grade__name'],
+            'year': row['grade__year'],
+            'count': 0,
+        })['count'] += row['count']
+    
+    return {
+        'college': sorted(colleges.values(), key=lambda item: item['code']),
+        'major': sorted(majors.values(), key=lambda item: item['code']),
+        'grade': sorted(grades.values(), key=lambda item: item['year'], reverse=True),
+    }
+
+
+def _get_student_stats(data_type, student_ids, start_date, end_date, id_subquery=None):
+    """
+    获取一批学生日期范围内的聚合统计（按学生粒度缓存）
+
+    Args:
+        student_ids: 学生ID列表
+        id_subquery: 与 student_ids 对应的 values('id') 查询集（可选），
+            全部未命中缓存时作为子查询使用，避免超长的 IN 参数列表
+
+    Returns:
+        dict: {student_id: stats}，包含所有学生（没有记录的学生为默认值）
+    """
+    version = get_data_statistics_version()
+    prefix = f'data_stats:{version}:{data_type}:{start_date.isoformat()}:{end_date.isoformat()}:'
+    keys = {student_id: f'{prefix}{student_id}' for student_id in student_ids}
+    cached = cache.get_many(keys.values())
+    
+    stats = {}
+    missing = []
+    for student_id, key in keys.items():
+        value = cached.get(key)
+        if value is None:
+            missing.append(student_id)
+        else:
+            stats[student_id] = value
+    
+    if missing:
+        # 一次查询批量计算所有未命中学生的统计数据
+        source = id_subquery if id_subquery is not None and len(missing) == len(keys) else missing
+        computed = BATCH_AGGREGATORS[data_type](source, start_date, end_date)
+        empty_stats = dict(EMPTY_STATS[data_type])
+        new_items = {}
+        for student_id in missing:
+            value = computed.get(student_id, empty_stats)
+            stats[student_id] = value
+            new_items[keys[student_id]] = value
+        cache.set_many(new_items, DATA_STATISTICS_CACHE_TIMEOUT)
+    
+    return stats
+
+
+def _add_stat_fields(result: dict[str, Any], data_type: str, stat_data) -> None:
+    """将聚合统计结果按数据类型写入学生行"""
+    if data_type == 'canteen':
+        result['avg_expense'] = stat_data.get('avg_expense', 0)
+        result['min_expense'] = stat_data.get('min_expense', 0)
+        result['expense_trend'] = stat_data.get('expense_trend', 0)
+    elif data_type in ('school_gate', 'dormitory'):
+        result['night_in_out_count'] = stat_data.get('night_in_out_count', 0)
+        result['late_night_in_out_count'] = stat_data.get('late_night_in_out_count', 0)
+        result['total_count'] = stat_data.get('total_count', 0)
+    elif data_type == 'network':
+        result['vpn_usage_rate'] = f"{stat_data.get('vpn_usage_rate', 0)}%"
+        result['night_usage_rate'] = f"{stat_data.get('night_usage_rate', 0)}%"
+        result['late_night_usage_rate'] = f"{stat_data.get('late_night_usage_rate', 0)}%"
+        result['avg_duration'] = f"{stat_data.get('avg_duration', 0)}小时"
+        result['max_duration'] = f"{stat_data.get('max_duration', 0)}小时"
+    elif data_type == 'academic':
+        result['avg_score'] = stat_data.get('avg_score', 0)
+        result['score_trend'] = stat_data.get('score_trend', 0)
+
+
+# 支持的数据表类型（与 DailyStatistics.data_type 一致）
+_DATA_STATISTICS_TYPES = frozenset(EMPTY_STATS)
+
+
 @login_required
-def api_data_statistics(request) -> JsonResponse:
+def api_data_statistics(request) -> HttpResponse:
     """
     实时计算数据统计API
     GET参数：
@@ -368,7 +579,7 @@ def api_data_statistics(request) -> JsonResponse:
     - page_size: 每页数量
     """
     if not check_staff_permission(request.user):
-        return JsonResponse({'error': '无权限访问'}, status=403)
+        return _json_response({'error': '无权限访问'}, status=403)
 
     students_queryset, college_id, major_id, grade_id, search = _from_request_to_query_info(request)
 
@@ -379,145 +590,76 @@ def api_data_statistics(request) -> JsonResponse:
     # print(f"DEBUG: Received data_table parameter: {data_table}")
     # print(f"DEBUG: All GET parameters: {dict(request.GET)}")
     
-    data_type_map = {
-        'canteen': 'canteen',
-        'school_gate': 'school_gate',
-        'dormitory': 'dormitory',
-        'network': 'network',
-        'academic': 'academic'
-    }
-    data_type = data_type_map.get(data_table)
-    if not data_type:
-        return JsonResponse({'error': f'无效的数据表类型: {data_table}'}, status=400)
+    if data_table not in _DATA_STATISTICS_TYPES:
+        return _json_response({'error': f'无效的数据表类型: {data_table}'}, status=400)
+    data_type = data_table
     
     # 日期范围
     start_date_str = request.GET.get('start_date')
     end_date_str = request.GET.get('end_date')
     
-    if end_date_str:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-    else:
-        end_date = timezone.now().date()
-    
-    if start_date_str:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-    else:
-        start_date = end_date - timedelta(days=30)
+    try:
+        end_date = date.fromisoformat(end_date_str) if end_date_str else timezone.now().date()
+        start_date = date.fromisoformat(start_date_str) if start_date_str else end_date - timedelta(days=30)
+    except ValueError:
+        return _json_response({'error': '日期格式错误，应为 YYYY-MM-DD'}, status=400)
     
     # 获取排序参数
     order_by = request.GET.get('order_by', 'student_id')
     order = request.GET.get('order', 'asc')
     
-    # 生成缓存键（基于所有影响统计结果的参数，排序参数不影响统计结果）
-    cache_key_data = {
-        'version': 'v5_daily_stats',  # 缓存版本号
-        'user_id': request.user.id,
-        'college': college_id,
-        'major': major_id,
-        'grade': grade_id,
-        'search': search,
-        'data_table': data_table,
-        'start_date': start_date.isoformat(),
-        'end_date': end_date.isoformat(),
-        # 注意：order_by 和 order 不包含在缓存键中，因为排序不需要重新计算统计
-    }
-    cache_key = 'data_stats_' + hashlib.md5(
-        json.dumps(cache_key_data, sort_keys=True).encode()
-    ).hexdigest()
-    
-    # 尝试从缓存获取
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        # 使用缓存的数据（未排序）
-        data_with_stats = cached_data
-    else:
-        # 缓存未命中，需要重新计算
-        
-        # 获取所有符合条件的学生（用于全局排序）
-        all_students = students_queryset.select_related('college', 'major', 'grade')
-        
-        # 实时计算所有学生的统计数据
-        data_with_stats = []
-        for student in all_students:
-            result = _from_one_student_stat_to_dict(student)
-            
-            # 根据数据类型聚合计算统计（基于每日统计）
-            if data_type == 'canteen':
-                stat_data = calculate_canteen_stats(student, start_date, end_date)
-                result['avg_expense'] = stat_data.get('avg_expense', 0)
-                result['min_expense'] = stat_data.get('min_expense', 0)
-                result['expense_trend'] = stat_data.get('expense_trend', 0)
-            elif data_type == 'school_gate':
-                stat_data = calculate_gate_stats(student, start_date, end_date)
-                result['night_in_out_count'] = stat_data.get('night_in_out_count', 0)
-                result['late_night_in_out_count'] = stat_data.get('late_night_in_out_count', 0)
-                result['total_count'] = stat_data.get('total_count', 0)
-            elif data_type == 'dormitory':
-                stat_data = calculate_dormitory_stats(student, start_date, end_date)
-                result['night_in_out_count'] = stat_data.get('night_in_out_count', 0)
-                result['late_night_in_out_count'] = stat_data.get('late_night_in_out_count', 0)
-                result['total_count'] = stat_data.get('total_count', 0)
-            elif data_type == 'network':
-                stat_data = calculate_network_stats(student, start_date, end_date)
-                result['vpn_usage_rate'] = f"{stat_data.get('vpn_usage_rate', 0)}%"
-                result['night_usage_rate'] = f"{stat_data.get('night_usage_rate', 0)}%"
-                result['late_night_usage_rate'] = f"{stat_data.get('late_night_usage_rate', 0)}%"
-                result['avg_duration'] = f"{stat_data.get('avg_duration', 0)}小时"
-                result['max_duration'] = f"{stat_data.get('max_duration', 0)}小时"
-                result['_vpn_usage_rate_raw'] = stat_data.get('vpn_usage_rate', 0)
-                result['_night_usage_rate_raw'] = stat_data.get('night_usage_rate', 0)
-                result['_late_night_usage_rate_raw'] = stat_data.get('late_night_usage_rate', 0)
-                result['_avg_duration_raw'] = stat_data.get('avg_duration', 0)
-                result['_max_duration_raw'] = stat_data.get('max_duration', 0)
-            elif data_type == 'academic':
-                stat_data = calculate_academic_stats(student, start_date, end_date)
-                result['avg_score'] = stat_data.get('avg_score', 0)
-                result['score_trend'] = stat_data.get('score_trend', 0)
-            
-            data_with_stats.append(result)
-        
-        # 缓存未排序的结果（5分钟）
-        cache.set(cache_key, data_with_stats, 300)
-    
-    # 对数据进行排序（无论是否来自缓存）
-    sort_key_map = {
-        'student_id': lambda x: x['student_id'],
-        'name': lambda x: x['name'],
-        'avg_expense': lambda x: x.get('avg_expense', 0),
-        'min_expense': lambda x: x.get('min_expense', 0),
-        'expense_trend': lambda x: x.get('expense_trend', 0),
-        'night_in_out_count': lambda x: x.get('night_in_out_count', 0),
-        'late_night_in_out_count': lambda x: x.get('late_night_in_out_count', 0),
-        'total_count': lambda x: x.get('total_count', 0),
-        'vpn_usage_rate': lambda x: x.get('_vpn_usage_rate_raw', 0),
-        'night_usage_rate': lambda x: x.get('_night_usage_rate_raw', 0),
-        'late_night_usage_rate': lambda x: x.get('_late_night_usage_rate_raw', 0),
-        'avg_duration': lambda x: x.get('_avg_duration_raw', 0),
-        'max_duration': lambda x: x.get('_max_duration_raw', 0),
-        'avg_score': lambda x: x.get('avg_score', 0),
-        'score_trend': lambda x: x.get('score_trend', 0),
-    }
+    # 分页
+    page, page_size, start, end = _get_page_info(request)
     
-    if order_by in sort_key_map:
-        data_with_stats.sort(key=sort_key_map[order_by], reverse=(order == 'desc'))
+    empty_stats = EMPTY_STATS[data_type]
     
-    # 总数
-    total_students = len(data_with_stats)
+    if order_by in empty_stats:
+        # 按统计字段排序：需要全部学生的统计结果才能排序，排序后只为当前页的学生构建完整数据
+        # 学生ID按默认顺序（学号）排列，排序稳定，统计值相同的学生保持学号顺序
+        student_ids = list(students_queryset.values_list('id', flat=True))
+        batch_stats = _get_student_stats(
+            data_type, student_ids, start_date, end_date, id_subquery=students_queryset.values('id')
+        )
+        
+        total_students = len(student_ids)
+        sorted_ids = sorted(
+            student_ids,
+            key=lambda student_id: batch_stats[student_id][order_by],
+            reverse=(order == 'desc'),
+        )
+        page_ids = sorted_ids[start:end]
+        rows_by_id = {
+            row['id']: row
+            for row in students_queryset.filter(id__in=page_ids).values(*_STUDENT_VALUES_FIELDS)
+        }
+        page_rows = [rows_by_id[student_id] for student_id in page_ids if student_id in rows_by_id]
+    else:
+        # 按学号/姓名排序（或未知排序字段时按默认学号顺序）：在数据库中排序分页，
+        # 只计算当前页学生的统计数据
+        if order_by == 'student_id':
+            students_queryset = students_queryset.order_by('-student_id' if order == 'desc' else 'student_id')
+        elif order_by == 'name':
+            # 同名学生按学号排列
+            students_queryset = students_queryset.order_by('-name' if order == 'desc' else 'name', 'student_id')
+        
+        # 总数通过窗口函数 COUNT(*) OVER () 随分页数据一并返回；页码超出范围时才单独计数
+        page_rows = list(
+            students_queryset.annotate(window_total=Window(Count('*')))
+            .values(*_STUDENT_VALUES_FIELDS, 'window_total')[start:end]
+        )
+        total_students = page_rows[0]['window_total'] if page_rows else students_queryset.count()
+        batch_stats = _get_student_stats(
+            data_type, [row['id'] for row in page_rows], start_date, end_date
+        )
     
-    # 分页
-    page, page_size, start, end = _get_page_info(request)
-
-    # 获取当前页数据并移除临时字段
+    # 学生信息直接取扁平字段，避免实例化学生及关联的学院/专业/年级模型
     data = []
-    for item in data_with_stats[start:end]:
-        item.pop('_vpn_usage_rate_raw', None)
-        item.pop('_night_usage_rate_raw', None)
-        item.pop('_late_night_usage_rate_raw', None)
-        item.pop('_avg_duration_raw', None)
-        item.pop('_max_duration_raw', None)
-        data.append(item)
-    
-    return JsonResponse({
+    for row in page_rows:
+        result = _from_student_values_to_dict(row)
+        _add_stat_fields(result, data_type, batch_stats[row['id']])
+        data.append(result)
+    
+    return _json_response({
         'success': True,
         'data': data,
         'total': total_students,
@@ -11,6 +11,8 @@ let currentFilters = {};
 let currentDataTable = 'basic'; // 当前选中的数据表
 let pageSize = 20; // 每页显示条数
 let totalCount = 0; // 总记录数
+let nextCursor = null; // 下一页游标（学生列表按学号排序时由后端返回）
+let pendingCursor = null; // 本次请求要携带的游标
 let apiUrl = ''; // API URL，从 HTML 的 data 属性中获取
 let loadingMessageId = null; // 加载消息 ID
 
@@ -250,6 +252,12 @@ function bindDropdownEvents() {
     const dataTableDropdown = document.getElementById('dropdown-data-table');
     dataTableDropdown.addEventListener('item-selected', function(e) {
         currentDataTable = e.detail.value;
+        // 新数据表没有当前排序列时恢复默认排序
+        const columns = tableColumns[currentDataTable] || tableColumns.basic;
+        if (!columns.some(col => col.field === currentOrderBy)) {
+            currentOrderBy = 'student_id';
+            currentOrder = 'asc';
+        }
         updateTableHeaders(currentDataTable);
         // 保存到缓存
         saveFiltersToCache();
@@ -346,6 +354,15 @@ function loadStudentList() {
         order: currentOrder,
         ...currentFilters
     });
+    // 筛选、排序、切换每页条数都会回到第一页，仅在第一页请求总数，翻页时沿用已有总数
+    if (currentPage === 1) {
+        params.set('with_total', '1');
+    }
+    // 顺序翻到下一页时带上游标，后端按学号排序时改用键集分页
+    if (pendingCursor) {
+        params.set('after', pendingCursor);
+        pendingCursor = null;
+    }
 
     // 根据当前数据表类型选择不同API
     let apiEndpoint;
@@ -390,10 +407,13 @@ function loadStudentList() {
             }
             
             if (data.success) {
-                totalCount = data.total; // 更新总数
+                nextCursor = data.next_cursor ?? null;
+                if (data.total !== undefined) {
+                    totalCount = data.total; // 更新总数
+                }
                 renderStudentTable(data);
                 renderPagination(data);
-                document.getElementById('table-info').textContent = `总计 ${data.total} 人`;
+                document.getElementById('table-info').textContent = `总计 ${totalCount} 人`;
             } else {
                 console.error('加载失败');
                 window.showMessage('加载数据失败', 'error', 3000);
@@ -520,7 +540,7 @@ function renderStudentTable(data) {
 // 渲染分页
 function renderPagination(data) {
     const pagination = document.getElementById('pagination');
-    const totalPages = data.total_pages;
+    const totalPages = data.total_pages ?? Math.max(Math.ceil(totalCount / pageSize), 1);
     
     let html = `
         <button onclick="changePage(${data.page - 1})" ${data.page === 1 ? 'disabled' : ''}>上一页</button>
@@ -549,6 +569,7 @@ function renderPagination(data) {
 
 // 切换页码
 function changePage(page) {
+    pendingCursor = (page === currentPage + 1) ? nextCursor : null;
     currentPage = page;
     loadStudentList();
 }